@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import argparse
+import socketserver
+import threading
+import zlib
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    create_engine, Column, String, Integer, Float, DateTime
+)
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+try:
+    from .replication import recv_frame, send_frame
+except ImportError:
+    from replication import recv_frame, send_frame
+
+Base = declarative_base()
+
+class FleetRobot(Base):
+    __tablename__ = "fleet_robots"
+    id          = Column(String, primary_key=True)
+    source      = Column(String, nullable=False, index=True)
+    status      = Column(String, nullable=False)
+    last_online = Column(Float, nullable=False)
+    power_level = Column(Float, default=0.0)
+
+class FleetModule(Base):
+    __tablename__ = "fleet_modules"
+    id          = Column(String, primary_key=True)
+    robot_id    = Column(String, nullable=False, index=True)
+    status      = Column(String, nullable=False)
+    last_online = Column(Float, nullable=False)
+
+class ReplicaSource(Base):
+    __tablename__ = "replica_sources"
+    id         = Column(String, primary_key=True)
+    epoch      = Column(String, nullable=False)
+    acked_seq  = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+DATABASE_URL = "sqlite:///./fleet.db"
+engine       = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+Session      = sessionmaker(bind=engine)
+Base.metadata.create_all(engine)
+
+# SQLite has a single writer; serialize batches from all robots
+_write_lock = threading.Lock()
+
+# what a corrupt frame or malformed batch can raise
+FRAME_ERRORS = (OSError, ValueError, KeyError, TypeError, zlib.error)
+
+def _upsert(sess, model, rows, update_cols):
+    if not rows:
+        return
+    stmt = insert(model.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["id"],
+        set_={col: stmt.excluded[col] for col in update_cols}
+    )
+    sess.execute(stmt, rows)
+
+def apply_batch(sess, source_id, epoch, batch):
+    """Upsert one batch and record its sequence as acknowledged, atomically."""
+    _upsert(sess, FleetModule, [
+        {"id": mid, "robot_id": rid, "status": status, "last_online": stamp}
+        for mid, rid, status, stamp in batch.get("modules", [])
+    ], ("robot_id", "status", "last_online"))
+    _upsert(sess, FleetRobot, [
+        {"id": rid, "source": source_id, "status": status, "last_online": stamp, "power_level": power}
+        for rid, status, stamp, power in batch.get("robots", [])
+    ], ("source", "status", "last_online", "power_level"))
+
+    src = sess.get(ReplicaSource, source_id)
+    if src is None:
+        src = ReplicaSource(id=source_id)
+        sess.add(src)
+    src.epoch      = epoch
+    src.acked_seq  = batch["seq"]
+    src.updated_at = datetime.now(timezone.utc)
+    sess.commit()
+
+class ReplicationHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        try:
+            hello = recv_frame(sock)
+            source_id, epoch = hello["source"], hello["epoch"]
+        except FRAME_ERRORS:
+            return
+
+        sess = Session()
+        try:
+            src = sess.get(ReplicaSource, source_id)
+            send_frame(sock, {
+                "epoch": src.epoch if src else None,
+                "acked": src.acked_seq if src else 0,
+            })
+            while True:
+                try:
+                    batch = recv_frame(sock)
+                    with _write_lock:
+                        apply_batch(sess, source_id, epoch, batch)
+                    send_frame(sock, {"acked": batch["seq"]})
+                except FRAME_ERRORS + (SQLAlchemyError,):
+                    # drop the partial batch and the connection; the robot
+                    # reconnects and resends from its last acknowledged seq
+                    sess.rollback()
+                    return
+        finally:
+            sess.close()
+
+class AggregatorServer(socketserver.ThreadingTCPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+
+    def __init__(self, addr):
+        super().__init__(addr, ReplicationHandler)
+
+def main(argv=None):
+    global engine, Session
+    parser = argparse.ArgumentParser(description="Central fleet state aggregator")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=7700)
+    parser.add_argument("--db", metavar="URL", default=DATABASE_URL,
+                        help=f"aggregator SQLite database (default {DATABASE_URL})")
+    args = parser.parse_args(argv)
+
+    if args.db != DATABASE_URL:
+        engine  = create_engine(args.db, connect_args={"check_same_thread": False})
+        Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(engine)
+
+    server = AggregatorServer((args.host, args.port))
+    print(f"Aggregating on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nExiting.")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import json
+import queue
+import sys
+import threading
+import time
+import urllib.request
+from collections import namedtuple
+
+Alert = namedtuple("Alert", "robot_id module_id name addr stamp suppressed")
+
+def format_alert(alert):
+    ip, port = alert.addr
+    line = (
+        "\033[91mSTATUS: FAILED\033[0m  "
+        f"Module '{alert.name}' ({alert.module_id}) @ {ip}:{port}"
+    )
+    if alert.suppressed:
+        line += f"  (+{alert.suppressed} repeats)"
+    return line
+
+class StdoutSink:
+    def emit(self, batch):
+        for alert in batch:
+            print(format_alert(alert))
+        sys.stdout.flush()
+
+class LogFileSink:
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, batch):
+        with open(self.path, "a", encoding="utf-8") as fh:
+            for alert in batch:
+                fh.write(json.dumps(alert._asdict()) + "\n")
+
+class WebhookSink:
+    """POSTs each batch as a JSON list, e.g. to a local http://127.0.0.1:<port>/alerts."""
+
+    def __init__(self, url, timeout=2.0):
+        self.url     = url
+        self.timeout = timeout
+
+    def emit(self, batch):
+        body = json.dumps([a._asdict() for a in batch]).encode("utf-8")
+        req  = urllib.request.Request(
+            self.url, data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout):
+            pass
+
+class AlertDispatcher:
+    """
+    Off-hot-path alert delivery. `submit` only enqueues; a worker thread
+    deduplicates repeats per module within `dedup_window` seconds, allows
+    at most `robot_rate` alerts per robot every `rate_period` seconds, and
+    hands batches of up to `batch_size` alerts to every sink.
+    """
+
+    def __init__(self, sinks=None, dedup_window=30.0, robot_rate=10, rate_period=60.0,
+                 batch_size=50, batch_interval=0.2, max_queue=10000, clock=time.monotonic):
+        self.sinks          = list(sinks) if sinks is not None else [StdoutSink()]
+        self.dedup_window   = dedup_window
+        self.robot_rate     = robot_rate
+        self.rate_period    = rate_period
+        self.batch_size     = batch_size
+        self.batch_interval = batch_interval
+        self.clock          = clock
+
+        self.queue        = queue.Queue(max_queue)
+        self.last_sent    = {}
+        self.suppressed   = {}
+        self.buckets      = {}
+        self.dropped      = 0
+        self.rate_limited = 0
+        self.errors       = 0
+        self._thread      = None
+        self._start_lock  = threading.Lock()
+
+    def submit(self, robot_id, module_id, name="", addr=("", 0)):
+        """Never blocks; alerts are dropped (and counted) if the queue is full."""
+        if self._thread is None:
+            self.start()
+        try:
+            self.queue.put_nowait(Alert(robot_id, module_id, name, addr, time.time(), 0))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Block until every alert submitted so far has been handled."""
+        self.queue.join()
+
+    def _admit(self, alert):
+        now = self.clock()
+
+        # dedupe: one alert per module per window, remembering how many were hidden
+        last = self.last_sent.get(alert.module_id)
+        if last is not None and now - last < self.dedup_window:
+            self.suppressed[alert.module_id] = self.suppressed.get(alert.module_id, 0) + 1
+            return None
+
+        # per-robot token bucket
+        tokens, stamp = self.buckets.get(alert.robot_id, (self.robot_rate, now))
+        tokens = min(self.robot_rate, tokens + (now - stamp) * self.robot_rate / self.rate_period)
+        if tokens < 1:
+            self.buckets[alert.robot_id] = (tokens, now)
+            self.rate_limited += 1
+            return None
+        self.buckets[alert.robot_id] = (tokens - 1, now)
+
+        self.last_sent[alert.module_id] = now
+        return alert._replace(suppressed=self.suppressed.pop(alert.module_id, 0))
+
+    def _emit(self, batch):
+        for sink in self.sinks:
+            try:
+                sink.emit(batch)
+            except Exception:
+                self.errors += 1
+
+    def _run(self):
+        while True:
+            items    = [self.queue.get()]
+            deadline = time.monotonic() + self.batch_interval
+            while len(items) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            batch = [a for a in map(self._admit, items) if a is not None]
+            if batch:
+                self._emit(batch)
+            for _ in items:
+                self.queue.task_done()
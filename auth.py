@@ -0,0 +1,120 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+
+# Stored credential: "pbkdf2_sha256$<iterations>$<salt hex>$<stored key hex>", where
+#   salted     = PBKDF2(password, salt, iterations)     (the slow part)
+#   client key = HMAC(salted, "Client Key")
+#   stored key = SHA256(client key)
+# as in SCRAM: the robot never stores anything that could be replayed as a
+# proof, and the client only pays PBKDF2 once per process, not per message.
+SCHEME     = "pbkdf2_sha256"
+ITERATIONS = 200_000
+
+def salted_password(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+def client_key(salted):
+    return hmac.new(salted, b"Client Key", hashlib.sha256).digest()
+
+def hash_password(password, salt=None, iterations=ITERATIONS):
+    salt   = os.urandom(16) if salt is None else salt
+    stored = hashlib.sha256(client_key(salted_password(password, salt, iterations))).digest()
+    return f"{SCHEME}${iterations}${salt.hex()}${stored.hex()}"
+
+def parse_hash(stored):
+    """(iterations, salt, stored key) or None for a legacy plaintext password."""
+    parts = stored.split("$")
+    if len(parts) != 4 or parts[0] != SCHEME:
+        return None
+    return int(parts[1]), bytes.fromhex(parts[2]), bytes.fromhex(parts[3])
+
+def verify_password(password, stored):
+    parsed = parse_hash(stored)
+    if parsed is None:
+        # rows created before passwords were hashed
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    iterations, salt, stored_key = parsed
+    candidate = hashlib.sha256(client_key(salted_password(password, salt, iterations))).digest()
+    return hmac.compare_digest(candidate, stored_key)
+
+def _xor(a, b):
+    return bytes(x ^ y for x, y in zip(a, b))
+
+def auth_message(client_nonce, server_nonce, sid):
+    return f"{client_nonce},{server_nonce},{sid}".encode("utf-8")
+
+def make_proof(ckey, auth_msg):
+    """Client side: proves knowledge of the client key without revealing it."""
+    stored_key = hashlib.sha256(ckey).digest()
+    return _xor(ckey, hmac.new(stored_key, auth_msg, hashlib.sha256).digest())
+
+def check_proof(stored_key, auth_msg, proof):
+    """Server side: the client key if `proof` is valid, else None. No PBKDF2 here."""
+    if len(proof) != len(stored_key):
+        return None
+    ckey = _xor(proof, hmac.new(stored_key, auth_msg, hashlib.sha256).digest())
+    if not hmac.compare_digest(hashlib.sha256(ckey).digest(), stored_key):
+        return None
+    return ckey
+
+def session_key(ckey, auth_msg):
+    return hmac.new(ckey, b"Session Key" + auth_msg, hashlib.sha256).digest()
+
+def _mac(key, sid, seq, msg):
+    body = json.dumps(msg, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hmac.new(key, f"{sid}:{seq}:".encode("utf-8") + body, hashlib.sha256).hexdigest()
+
+def sign(key, sid, seq, msg):
+    return {"sid": sid, "seq": seq, "msg": msg, "mac": _mac(key, sid, seq, msg)}
+
+class SessionCache:
+    """In-memory session keys with expiry; one HMAC per message to verify."""
+
+    def __init__(self, ttl=3600.0, clock=time.monotonic):
+        self.ttl      = ttl
+        self.clock    = clock
+        self.lock     = threading.Lock()
+        self.sessions = {}
+
+    def new_sid(self):
+        return os.urandom(12).hex()
+
+    def add(self, sid, key):
+        with self.lock:
+            self.sessions[sid] = [key, self.clock() + self.ttl, 0]
+
+    def drop(self, sid):
+        with self.lock:
+            self.sessions.pop(sid, None)
+
+    def verify(self, frame):
+        """The signed message if `frame` is valid, fresh and not replayed, else None."""
+        try:
+            sid, seq, msg, mac = frame["sid"], frame["seq"], frame["msg"], frame["mac"]
+        except (KeyError, TypeError):
+            return None
+        with self.lock:
+            entry = self.sessions.get(sid)
+            if entry is None:
+                return None
+            key, expires, last_seq = entry
+            if self.clock() >= expires:
+                del self.sessions[sid]
+                return None
+        if not isinstance(seq, int) or seq <= last_seq:
+            return None
+        # compare_digest raises on non-ASCII str; compare bytes instead
+        if not isinstance(mac, str) or not mac.isascii():
+            return None
+        if not hmac.compare_digest(_mac(key, sid, seq, msg).encode("ascii"), mac.encode("ascii")):
+            return None
+        with self.lock:
+            # reject replays of a sequence number already accepted
+            if seq <= entry[2]:
+                return None
+            entry[2] = seq
+        return msg
@@ -0,0 +1,53 @@
+import json
+import struct
+import threading
+import time
+
+MAGIC  = b"RCAP"
+HEADER = struct.Struct("<4sd")   # magic, capture start (epoch seconds)
+RECORD = struct.Struct("<dI")    # offset from start (seconds), payload length
+
+class CaptureWriter:
+    """Appends incoming status messages, with arrival offsets, to a compact binary file."""
+
+    def __init__(self, path):
+        self.path  = path
+        self.start = time.time()
+        self.lock  = threading.Lock()
+        self.count = 0
+        self._fh   = open(path, "wb")
+        self._fh.write(HEADER.pack(MAGIC, self.start))
+
+    def record(self, msg, stamp=None):
+        data   = json.dumps(msg, separators=(",", ":")).encode("utf-8")
+        offset = (time.time() if stamp is None else stamp) - self.start
+        with self.lock:
+            self._fh.write(RECORD.pack(offset, len(data)))
+            self._fh.write(data)
+            self.count += 1
+
+    def flush(self):
+        with self.lock:
+            self._fh.flush()
+
+    def close(self):
+        with self.lock:
+            self._fh.close()
+
+def read_capture(path):
+    """Return (start, [(offset, msg), ...]) from a capture file."""
+    with open(path, "rb") as fh:
+        magic, start = HEADER.unpack(fh.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a capture file")
+        records = []
+        while True:
+            head = fh.read(RECORD.size)
+            if len(head) < RECORD.size:
+                break
+            offset, length = RECORD.unpack(head)
+            data = fh.read(length)
+            if len(data) < length:
+                break   # truncated tail from an interrupted capture
+            records.append((offset, json.loads(data.decode("utf-8"))))
+    return start, records
@@ -0,0 +1,136 @@
+import threading
+from array import array
+from collections import OrderedDict
+
+# statuses are kept as small ints; index into STATUS_NAMES for the enum name
+IDLE, RUNNING, FAILED = 0, 1, 2
+STATUS_NAMES = ("IDLE", "RUNNING", "FAILED")
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+class FleetState:
+    """
+    Column-oriented in-memory view of robots and their modules.
+
+    Every module/robot UUID is mapped once to an integer slot; per-slot
+    fields live in parallel typed arrays. Each robot also keeps a count of
+    its modules per status, so the aggregate robot status is O(1) to derive.
+
+    Every change also bumps a sequence number and moves the changed
+    ("module"|"robot", slot) key to the end of `changes`, which therefore
+    lists unreplicated changes oldest first (see replication.py).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        # modules
+        self.slots       = {}
+        self.ids         = []
+        self.status      = array("b")
+        self.last_online = array("d")
+        self.robot_slot  = array("l")
+        self.names       = []
+        self.addrs       = []
+
+        # robots
+        self.robot_slots       = {}
+        self.robot_ids         = []
+        self.robot_status      = array("b")
+        self.robot_last_online = array("d")
+        self.robot_power       = array("d")
+        self.counts            = []
+
+        # change log
+        self.seq     = 0
+        self.changes = OrderedDict()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _touch(self, kind, slot):
+        self.seq += 1
+        key = (kind, slot)
+        self.changes[key] = self.seq
+        self.changes.move_to_end(key)
+
+    def changes_after(self, seq, limit):
+        """Up to `limit` (kind, slot, seq) changed after `seq`, oldest first."""
+        out = []
+        for (kind, slot), changed in self.changes.items():
+            if changed > seq:
+                out.append((kind, slot, changed))
+                if len(out) >= limit:
+                    break
+        return out
+
+    def prune(self, seq):
+        """Forget changes up to and including `seq` (acknowledged downstream)."""
+        while self.changes:
+            key, changed = next(iter(self.changes.items()))
+            if changed > seq:
+                break
+            del self.changes[key]
+
+    def touch_all(self):
+        for rslot in range(len(self.robot_ids)):
+            self._touch("robot", rslot)
+        for slot in range(len(self.ids)):
+            self._touch("module", slot)
+
+    def add_robot(self, robot_id, status, last_online=0.0, power_level=0.0):
+        rslot = self.robot_slots.get(robot_id)
+        if rslot is not None:
+            return rslot
+        rslot = len(self.robot_ids)
+        self.robot_slots[robot_id] = rslot
+        self.robot_ids.append(robot_id)
+        self.robot_status.append(status)
+        self.robot_last_online.append(last_online)
+        self.robot_power.append(power_level or 0.0)
+        self.counts.append(array("l", (0, 0, 0)))
+        self._touch("robot", rslot)
+        return rslot
+
+    def add_module(self, module_id, rslot, status, last_online=0.0, name="", addr=("", 0)):
+        slot = self.slots.get(module_id)
+        if slot is not None:
+            return slot
+        slot = len(self.ids)
+        self.slots[module_id] = slot
+        self.ids.append(module_id)
+        self.status.append(status)
+        self.last_online.append(last_online)
+        self.robot_slot.append(rslot)
+        self.names.append(name)
+        self.addrs.append(addr)
+        self.counts[rslot][status] += 1
+        self._touch("module", slot)
+        return slot
+
+    def aggregate(self, rslot):
+        counts = self.counts[rslot]
+        if counts[FAILED]:
+            return FAILED
+        if counts[RUNNING]:
+            return RUNNING
+        return IDLE
+
+    def set_status(self, slot, status, stamp):
+        """Record a module status change; returns the robot's new aggregate status."""
+        rslot  = self.robot_slot[slot]
+        counts = self.counts[rslot]
+        counts[self.status[slot]] -= 1
+        counts[status] += 1
+        self.status[slot]      = status
+        self.last_online[slot] = stamp
+
+        robot_status = self.aggregate(rslot)
+        self.robot_status[rslot]      = robot_status
+        self.robot_last_online[rslot] = stamp
+        self._touch("module", slot)
+        self._touch("robot", rslot)
+        return robot_status
+
+    def set_power(self, rslot, power_level):
+        self.robot_power[rslot] = power_level
+        self._touch("robot", rslot)
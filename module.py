@@ -1,7 +1,9 @@
 import sys
+import os
 import socket
 import json
 import enum
+import getpass
 from datetime import datetime, timezone
 
 from sqlalchemy import (
@@ -49,12 +51,45 @@ class Module(Base):
 engine = create_engine("sqlite:///robots.db")
 Session = sessionmaker(bind=engine)
 
+def build_payload(module_id, status, telemetry=None):
+    """
+    Status message for the parent robot. `telemetry` maps a channel name
+    (e.g. "power_level", "accel_x") to a number or a list of samples.
+    """
+    payload = {"module_id": module_id, "status": status}
+    if telemetry:
+        payload["telemetry"] = telemetry
+    return payload
+
+def parse_telemetry_args(tokens):
+    """
+    ["power_level=0.8", "accel_x=0.1,0.2"] -> {"power_level": 0.8, "accel_x": [0.1, 0.2]}.
+    Raises ValueError on a malformed token.
+    """
+    telemetry = {}
+    for token in tokens:
+        channel, sep, raw = token.partition("=")
+        if not sep or not channel or not raw:
+            raise ValueError(f"expected channel=value[,value...], got {token!r}")
+        values = [float(v) for v in raw.split(",")]
+        telemetry[channel] = values[0] if len(values) == 1 else values
+    return telemetry
+
+def send_payload(robot_obj, payload):
+    with socket.socket() as sock:
+        sock.connect((robot_obj.ip_address, robot_obj.port))
+        sock.sendall(json.dumps(payload).encode("utf-8"))
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: module <module_id>")
+    args = sys.argv[1:]
+    use_auth = "--auth" in args
+    if use_auth:
+        args.remove("--auth")
+    if len(args) != 1:
+        print("Usage: module <module_id> [--auth]")
         sys.exit(1)
 
-    module_id = sys.argv[1]
+    module_id = args[0]
     session = Session()
 
     module_obj = session.query(Module).filter_by(id=module_id).first()
@@ -69,12 +104,22 @@ def main():
         session.close()
         sys.exit(1)
 
+    # with --auth, updates go over one authenticated agent session (see module_agent.py)
+    agent = None
+    if use_auth:
+        try:
+            from .module_agent import ModuleAgent
+        except ImportError:
+            from module_agent import ModuleAgent
+        password = os.environ.get("ROBOT_PASSWORD") or getpass.getpass("Robot password: ")
+        agent = ModuleAgent(session, robot_obj, [module_obj.id], password)
+
     print(f"Module {module_obj.id} ({module_obj.name}) current status: {module_obj.status.value}")
     print(f"→ sending updates to {robot_obj.ip_address}:{robot_obj.port}\n")
 
     while True:
         try:
-            raw = input("Enter new status (RUNNING, IDLE, FAILED): ")
+            raw = input("Enter new status (RUNNING, IDLE, FAILED) [channel=value[,value...] ...]: ")
         except KeyboardInterrupt:
             print("\nExiting.")
             break
@@ -83,22 +128,34 @@ def main():
             print("\nExiting.")
             break
 
-        status_str = raw.strip().upper()
+        tokens = raw.split()
+        status_str = tokens[0].upper() if tokens else ""
         if status_str not in [s.value for s in StatusEnum]:
             print(f"Invalid status. Choose one of: {', '.join([s.value for s in StatusEnum])}")
             continue
+        try:
+            telemetry = parse_telemetry_args(tokens[1:])
+        except ValueError as exc:
+            print(f"Invalid telemetry: {exc}")
+            continue
 
-        module_obj.status = StatusEnum(status_str)
-        module_obj.last_online = datetime.now(timezone.utc)
-        session.commit()
+        payload = build_payload(module_obj.id, status_str, telemetry)
+        if agent is None:
+            module_obj.status = StatusEnum(status_str)
+            module_obj.last_online = datetime.now(timezone.utc)
+            session.commit()
+            send_payload(robot_obj, payload)
+        else:
+            try:
+                agent.post(module_obj.id, status_str, telemetry)
+            except OSError as exc:
+                print(f"ERROR: robot did not accept the update: {exc}")
+                continue
         print(f"Updated → status={module_obj.status.value}, last_online={module_obj.last_online.isoformat()}")
+        print(f"Sent → {payload}")
 
-        payload = {"module_id": module_obj.id, "status": module_obj.status.value}
-        with socket.socket() as sock:
-            sock.connect((robot_obj.ip_address, robot_obj.port))
-            sock.sendall(json.dumps(payload).encode("utf-8"))
-            print(f"Sent → {payload}")
-
+    if agent is not None:
+        agent.close()
     session.close()
     return
 
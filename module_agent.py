@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+import argparse
+import getpass
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    from . import auth, module
+except ImportError:
+    import auth, module
+
+DEFAULT_SOCKET = "/tmp/module_agent.sock"
+
+class ModuleAgent:
+    """
+    Hosts many module ids in one process: one DB session for all of them
+    and one persistent, newline-delimited JSON connection to the parent
+    robot (opened with a `hello` line the robot answers before any status).
+
+    With a `password`, the hello starts a challenge-response handshake and
+    every later line is HMAC-signed with the resulting session key.
+    """
+
+    def __init__(self, session, robot_obj, module_ids, password=None, timeout=5.0):
+        self.session  = session
+        self.robot    = robot_obj
+        self.timeout  = timeout
+        self.modules  = {}
+        self.db_lock  = threading.Lock()
+        self.net_lock = threading.Lock()
+        self.sock     = None
+        self.reader   = None
+        self.password = password
+        self.sid      = None
+        self.key      = None
+        self.seq      = 0
+        self.expires  = None
+        self._nonce   = None
+        self._ckeys   = {}
+
+        for mid in module_ids:
+            mod = session.query(module.Module).filter_by(id=mid).first()
+            if mod is None:
+                raise ValueError(f"module {mid} not found")
+            if mod.robot_id != robot_obj.id:
+                raise ValueError(f"module {mid} belongs to robot {mod.robot_id}")
+            self.modules[mid] = mod
+
+    def hello(self):
+        hello = {"hello": "agent", "modules": sorted(self.modules)}
+        if self.password is not None:
+            self._nonce   = os.urandom(16).hex()
+            hello["auth"] = {"client_nonce": self._nonce}
+        return hello
+
+    def _client_key(self, salt, iterations):
+        # PBKDF2 is paid once per process, not per connection or message
+        ckey = self._ckeys.get((salt, iterations))
+        if ckey is None:
+            ckey = auth.client_key(auth.salted_password(self.password, salt, iterations))
+            self._ckeys[(salt, iterations)] = ckey
+        return ckey
+
+    def connect(self):
+        sock = socket.create_connection((self.robot.ip_address, self.robot.port), timeout=self.timeout)
+        reader = sock.makefile("rb")
+        sock.sendall(json.dumps(self.hello()).encode("utf-8") + b"\n")
+        reply = reader.readline()
+        if not reply:
+            sock.close()
+            raise ConnectionError("robot closed the connection during hello")
+        self.handshake(json.loads(reply.decode("utf-8")), sock, reader)
+        self.sock, self.reader = sock, reader
+
+    def handshake(self, reply, sock, reader):
+        self.sid, self.key, self.seq, self.expires = None, None, 0, None
+        challenge = reply.get("challenge")
+        if challenge is not None and self.password is not None:
+            ckey     = self._client_key(bytes.fromhex(challenge["salt"]), challenge["iterations"])
+            auth_msg = auth.auth_message(self._nonce, challenge["server_nonce"], challenge["sid"])
+            proof    = auth.make_proof(ckey, auth_msg)
+            sock.sendall(json.dumps({"proof": proof.hex()}).encode("utf-8") + b"\n")
+            reply    = json.loads(reader.readline().decode("utf-8") or "{}")
+            if reply.get("ready"):
+                self.sid = challenge["sid"]
+                self.key = auth.session_key(ckey, auth_msg)
+                # re-authenticate a little before the robot expires the session
+                if reply.get("ttl"):
+                    self.expires = time.monotonic() + 0.9 * reply["ttl"]
+        if not reply.get("ready"):
+            sock.close()
+            raise ConnectionError(f"robot refused agent: {reply}")
+
+    def frame(self, payload):
+        if self.key is not None:
+            self.seq += 1
+            payload = auth.sign(self.key, self.sid, self.seq, payload)
+        return json.dumps(payload).encode("utf-8") + b"\n"
+
+    def close(self):
+        with self.net_lock:
+            if self.sock is not None:
+                self.sock.close()
+                self.sock, self.reader = None, None
+
+    def _send(self, payload):
+        """
+        Send one message and wait for the robot's ack. A missing ack (EOF,
+        an error line or a timeout) means the robot may not have applied it,
+        so the message is resent once over a fresh connection; status
+        messages are idempotent, so a duplicate is harmless.
+        """
+        with self.net_lock:
+            for attempt in (1, 2):
+                try:
+                    if self.sock is not None and self.expires and time.monotonic() >= self.expires:
+                        self.sock.close()
+                        self.sock, self.reader = None, None
+                    if self.sock is None:
+                        self.connect()
+                    self.sock.sendall(self.frame(payload))
+                    reply = self.reader.readline()
+                    if not reply:
+                        raise ConnectionError("robot closed the connection")
+                    reply = json.loads(reply.decode("utf-8"))
+                    if "ack" not in reply:
+                        raise ConnectionError(f"robot did not accept message: {reply}")
+                    return
+                except OSError:
+                    # one reconnect per message; a second failure is reported
+                    if self.sock is not None:
+                        self.sock.close()
+                    self.sock, self.reader = None, None
+                    if attempt == 2:
+                        raise
+
+    def post(self, module_id, status, telemetry=None):
+        mod = self.modules.get(module_id)
+        if mod is None:
+            raise KeyError(f"module {module_id} is not hosted by this agent")
+        status = module.StatusEnum(status)
+
+        with self.db_lock:
+            mod.status      = status
+            mod.last_online = datetime.now(timezone.utc)
+            self.session.commit()
+
+        self._send(module.build_payload(module_id, status.value, telemetry))
+
+    def serve(self, path=DEFAULT_SOCKET):
+        """Local API: newline-delimited JSON requests on a Unix socket."""
+        if os.path.exists(path):
+            os.unlink(path)
+        server = AgentServer(path, self)
+        print(f"Agent hosting {len(self.modules)} modules on {path}")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            os.unlink(path)
+
+class AgentRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                req = json.loads(line.decode("utf-8"))
+                self.server.agent.post(req["module_id"], req["status"], req.get("telemetry"))
+                reply = {"ok": True}
+            except (ValueError, KeyError, TypeError, OSError) as exc:
+                reply = {"ok": False, "error": str(exc)}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+class AgentServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, agent):
+        self.agent = agent
+        super().__init__(path, AgentRequestHandler)
+
+class AgentClient:
+    """For sensor code: post status/telemetry to a local agent."""
+
+    def __init__(self, path=DEFAULT_SOCKET):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.reader = self.sock.makefile("rb")
+
+    def post(self, module_id, status, telemetry=None):
+        self.sock.sendall(json.dumps(module.build_payload(module_id, status, telemetry)).encode("utf-8") + b"\n")
+        reply = json.loads(self.reader.readline().decode("utf-8"))
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error"))
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host many modules in one process")
+    parser.add_argument("module_ids", nargs="*", help="module ids to host")
+    parser.add_argument("--robot", metavar="ID", help="host every module of this robot")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="local API socket path")
+    parser.add_argument("--no-auth", action="store_true",
+                        help="do not authenticate to the robot (robot must allow it)")
+    args = parser.parse_args(argv)
+
+    session = module.Session()
+    ids = list(args.module_ids)
+    if args.robot:
+        ids += [mid for (mid,) in session.query(module.Module.id).filter_by(robot_id=args.robot)]
+    if not ids:
+        parser.error("no modules to host")
+
+    first = session.query(module.Module).filter_by(id=ids[0]).first()
+    if first is None:
+        print(f"ERROR: module {ids[0]} not found."); sys.exit(1)
+    robot_obj = session.query(module.Robot).filter_by(id=first.robot_id).first()
+    if robot_obj is None:
+        print(f"ERROR: robot {first.robot_id} not found."); sys.exit(1)
+
+    password = None
+    if not args.no_auth:
+        password = os.environ.get("ROBOT_PASSWORD") or getpass.getpass("Robot password: ")
+    try:
+        agent = ModuleAgent(session, robot_obj, ids, password)
+    except ValueError as exc:
+        print(f"ERROR: {exc}"); sys.exit(1)
+    agent.connect()
+    print(f"→ multiplexing {len(ids)} modules to {robot_obj.ip_address}:{robot_obj.port}")
+    try:
+        agent.serve(args.socket)
+    except KeyboardInterrupt:
+        print("\nExiting.")
+    finally:
+        agent.close()
+        session.close()
+
+if __name__ == "__main__":
+    main()
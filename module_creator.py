@@ -1,5 +1,6 @@
 import enum
 import uuid
+import argparse
 from datetime import datetime, timezone
 
 from sqlalchemy import (
@@ -9,6 +10,11 @@ from sqlalchemy import (
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+try:
+    from .robot_lookup import browse_robots, match_robots
+except ImportError:
+    from robot_lookup import browse_robots, match_robots
+
 Base = declarative_base()
 
 class StatusEnum(enum.Enum):
@@ -43,17 +49,27 @@ engine       = create_engine(DATABASE_URL, connect_args={"check_same_thread": Fa
 Session      = sessionmaker(bind=engine)
 Base.metadata.create_all(engine)
 
-def choose_robot(sess):
-    robots = sess.query(Robot).all()
-    print("Available robot UUIDs:")
-    for r in robots:
-        print(f"  {r.id}")
-    rid = input("Enter target robot UUID: ").strip()
-    return rid
+def choose_robot(sess, selector=None):
+    """Robot id for `selector` (id or unique prefix), or from the picker; None if none fits."""
+    if selector:
+        matches = match_robots(sess, Robot, selector)
+        if len(matches) > 1:
+            print("Ambiguous robot ID")
+        return matches[0].id if len(matches) == 1 else None
+    robot = browse_robots(
+        sess, Robot, lambda r: r.id,
+        "Available robot UUIDs:",
+        "Enter target robot UUID (or prefix), /<prefix> to search, blank for more: "
+    )
+    return robot.id if robot else None
 
-def main():
+def main(robot_id=None):
     sess = Session()
-    rid  = choose_robot(sess)
+    rid  = choose_robot(sess, robot_id)
+    if not rid:
+        print("No such robot.")
+        sess.close()
+        return
 
     name = input("Module Name: ").strip()
 
@@ -90,4 +106,7 @@ def main():
     sess.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Create a module")
+    parser.add_argument("--robot", metavar="ID",
+                        help="target robot id (or unique id prefix), skipping the picker")
+    main(parser.parse_args().robot)
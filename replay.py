@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import queue
+import socket
+import sys
+import threading
+import time
+import zlib
+
+from sqlalchemy import create_engine, text
+
+try:
+    from .capture import read_capture
+except ImportError:
+    from capture import read_capture
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+def expected_final_state(records):
+    """Last reported status per module, as the server should end up."""
+    final = {}
+    for _, msg in records:
+        if not isinstance(msg, dict) or "module_id" not in msg:
+            continue
+        if msg.get("status") in ("IDLE", "RUNNING", "FAILED"):
+            final[msg["module_id"]] = msg["status"]
+    return final
+
+def divergence(expected, actual):
+    """{module_id: (expected, actual)} for every module whose final status differs."""
+    return {
+        mid: (want, actual.get(mid))
+        for mid, want in expected.items()
+        if actual.get(mid) != want
+    }
+
+def load_db_state(url, module_ids):
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, status FROM modules")).all()
+    engine.dispose()
+    wanted = set(module_ids)
+    return {mid: status for mid, status in rows if mid in wanted}
+
+def _send(host, port, msg, timeout):
+    # the server closes the connection once the message is processed, so
+    # waiting for EOF measures end-to-end latency and keeps per-module order
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(json.dumps(msg).encode("utf-8"))
+        sock.shutdown(socket.SHUT_WR)
+        while sock.recv(1024):
+            pass
+
+def replay(records, host, port, speed=1.0, concurrency=8, timeout=5.0):
+    """
+    Re-send captured messages to host:port. `speed` scales the captured
+    inter-arrival times (2.0 = twice as fast); 0 or None replays as fast as
+    possible. Each simulated module is pinned to one of `concurrency`
+    senders, so per-module ordering is preserved.
+    """
+    lanes     = [queue.Queue() for _ in range(concurrency)]
+    latencies = []
+    lags      = []
+    errors    = []
+    lock      = threading.Lock()
+
+    def sender(lane):
+        while True:
+            item = lane.get()
+            if item is None:
+                return
+            due, msg = item
+            t0 = time.perf_counter()
+            try:
+                _send(host, port, msg, timeout)
+            except OSError as exc:
+                with lock:
+                    errors.append(exc)
+                continue
+            t1 = time.perf_counter()
+            with lock:
+                latencies.append(t1 - t0)
+                if due is not None:
+                    lags.append(max(0.0, t0 - due))
+
+    threads = [threading.Thread(target=sender, args=(lane,), daemon=True) for lane in lanes]
+    for t in threads:
+        t.start()
+
+    began = time.perf_counter()
+    for offset, msg in records:
+        due = None
+        if speed:
+            due = began + offset / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        key = str(msg.get("module_id", "")) if isinstance(msg, dict) else ""
+        lanes[zlib.crc32(key.encode("utf-8")) % concurrency].put((due, msg))
+
+    for lane in lanes:
+        lane.put(None)
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - began
+
+    return {
+        "sent":        len(latencies),
+        "errors":      len(errors),
+        "elapsed":     elapsed,
+        "rate":        len(latencies) / elapsed if elapsed else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": max(latencies, default=0.0),
+        "lag_p99":     percentile(lags, 99),
+    }
+
+def parse_speed(value):
+    if value.lower() == "max":
+        return 0.0
+    return float(value.lower().rstrip("x"))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a robot traffic capture")
+    parser.add_argument("capture", help="file written by `robot.py --capture`")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--speed", type=parse_speed, default=1.0,
+                        help="1x (default), Nx, or 'max'")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="number of concurrent simulated module senders")
+    parser.add_argument("--db", metavar="URL",
+                        help="test server database to check final module state against")
+    parser.add_argument("--settle", type=float, default=1.0,
+                        help="seconds to wait before reading --db")
+    args = parser.parse_args(argv)
+
+    _, records = read_capture(args.capture)
+    print(f"Replaying {len(records)} messages to {args.host}:{args.port} "
+          f"at {'max' if not args.speed else f'{args.speed:g}x'} speed")
+    stats = replay(records, args.host, args.port, args.speed, args.concurrency)
+
+    print(f"sent={stats['sent']} errors={stats['errors']} "
+          f"elapsed={stats['elapsed']:.3f}s rate={stats['rate']:.1f}/s")
+    print("send latency  "
+          f"p50={stats['latency_p50'] * 1e3:.2f}ms p95={stats['latency_p95'] * 1e3:.2f}ms "
+          f"p99={stats['latency_p99'] * 1e3:.2f}ms max={stats['latency_max'] * 1e3:.2f}ms")
+    if args.speed:
+        print(f"schedule lag  p99={stats['lag_p99'] * 1e3:.2f}ms")
+
+    if args.db:
+        time.sleep(args.settle)
+        expected = expected_final_state(records)
+        diff     = divergence(expected, load_db_state(args.db, expected))
+        print(f"final state: {len(expected) - len(diff)}/{len(expected)} modules match")
+        for mid, (want, got) in sorted(diff.items()):
+            print(f"  {mid}: expected {want}, got {got}")
+        if diff:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import json
+import socket
+import struct
+import threading
+import uuid
+import zlib
+
+try:
+    from .fleet_state import STATUS_NAMES
+except ImportError:
+    from fleet_state import STATUS_NAMES
+
+# Frames are a 4-byte length followed by zlib-compressed JSON.
+FRAME = struct.Struct("<I")
+MAX_FRAME = 64 << 20
+
+def send_frame(sock, obj):
+    data = zlib.compress(json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+    sock.sendall(FRAME.pack(len(data)) + data)
+    return len(data)
+
+def _recv_exact(sock, n):
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf += chunk
+    return buf
+
+def recv_frame(sock):
+    (length,) = FRAME.unpack(_recv_exact(sock, FRAME.size))
+    if length > MAX_FRAME:
+        raise ValueError(f"frame of {length} bytes is too large")
+    return json.loads(zlib.decompress(_recv_exact(sock, length)).decode("utf-8"))
+
+def collect_batch(fleet, after, limit):
+    """
+    Rows changed after sequence `after` (caller holds fleet.lock). Returns
+    None when there is nothing new, else a batch whose "seq" is the highest
+    change it covers.
+    """
+    changes = fleet.changes_after(after, limit)
+    if not changes:
+        return None
+    modules, robots = [], []
+    for kind, slot, _ in changes:
+        if kind == "module":
+            modules.append([
+                fleet.ids[slot],
+                fleet.robot_ids[fleet.robot_slot[slot]],
+                STATUS_NAMES[fleet.status[slot]],
+                fleet.last_online[slot],
+            ])
+        else:
+            robots.append([
+                fleet.robot_ids[slot],
+                STATUS_NAMES[fleet.robot_status[slot]],
+                fleet.robot_last_online[slot],
+                fleet.robot_power[slot],
+            ])
+    return {"seq": changes[-1][2], "modules": modules, "robots": robots}
+
+class Replicator:
+    """
+    Ships changed module/robot rows from a FleetState to an aggregator.
+
+    The aggregator answers the hello with the epoch and last sequence it
+    has committed for this source; the replicator resumes after it. A new
+    epoch (this process restarted, so sequences restarted) makes it resend
+    everything once. Changes are pruned from the fleet's log only once
+    acknowledged.
+    """
+
+    def __init__(self, fleet, host, port, source_id, batch_size=500, interval=1.0, timeout=10.0):
+        self.fleet      = fleet
+        self.addr       = (host, port)
+        self.source_id  = source_id
+        self.batch_size = batch_size
+        self.interval   = interval
+        self.timeout    = timeout
+        self.epoch      = uuid.uuid4().hex
+        self.sock       = None
+        self.sent       = 0
+        self.bytes_sent = 0
+        self.rows_sent  = 0
+        self.batches    = 0
+        self._stop      = threading.Event()
+
+    def connect(self):
+        sock = socket.create_connection(self.addr, timeout=self.timeout)
+        send_frame(sock, {"source": self.source_id, "epoch": self.epoch})
+        reply = recv_frame(sock)
+        with self.fleet.lock:
+            if reply.get("epoch") == self.epoch:
+                self.sent = reply.get("acked", 0)
+                self.fleet.prune(self.sent)
+            else:
+                self.sent = 0
+                self.fleet.touch_all()
+        self.sock = sock
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def sync_once(self):
+        """Send batches until the aggregator has acknowledged every change."""
+        if self.sock is None:
+            self.connect()
+        while True:
+            with self.fleet.lock:
+                batch = collect_batch(self.fleet, self.sent, self.batch_size)
+            if batch is None:
+                return
+            self.bytes_sent += send_frame(self.sock, batch)
+            reply = recv_frame(self.sock)
+            if reply.get("acked") != batch["seq"]:
+                raise ConnectionError(f"unexpected ack {reply}")
+            self.sent       = batch["seq"]
+            self.batches   += 1
+            self.rows_sent += len(batch["modules"]) + len(batch["robots"])
+            with self.fleet.lock:
+                self.fleet.prune(self.sent)
+
+    def run(self):
+        backoff = self.interval
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+                backoff = self.interval
+            except (OSError, ValueError, KeyError, TypeError, zlib.error):
+                # a corrupt frame or unexpected reply must not kill the thread
+                self.close()
+                backoff = min(backoff * 2, 30.0)
+            self._stop.wait(backoff)
+        self.close()
+
+    def start(self):
+        t = threading.Thread(target=self.run, daemon=True)
+        t.start()
+        return t
+
+    def stop(self):
+        self._stop.set()
@@ -7,13 +7,28 @@ import socket
 import json
 import getpass
 import sys
+import argparse
+import math
+import os
 from datetime import datetime, timezone
 from sqlalchemy import (
     create_engine, Column, String, Integer, Float,
-    DateTime, Enum as SAEnum, ForeignKey, event
+    DateTime, Enum as SAEnum, ForeignKey, event, inspect, select, update
 )
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 
+# sibling modules resolve both as a package (tests) and as plain scripts
+try:
+    from . import alerts, auth, capture, statusboard, telemetry
+    from .replication import Replicator
+    from .robot_lookup import find_robots, match_robots, browse_robots
+    from .fleet_state import FleetState, STATUS_CODES, STATUS_NAMES
+except ImportError:
+    import alerts, auth, capture, statusboard, telemetry
+    from replication import Replicator
+    from robot_lookup import find_robots, match_robots, browse_robots
+    from fleet_state import FleetState, STATUS_CODES, STATUS_NAMES
+
 Base = declarative_base()
 
 class StatusEnum(enum.Enum):
@@ -30,8 +45,8 @@ class ModuleType(enum.Enum):
 class Robot(Base):
     __tablename__ = "robots"
     id               = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    name             = Column(String, nullable=False)
-    owner            = Column(String, nullable=False)
+    name             = Column(String, nullable=False, index=True)
+    owner            = Column(String, nullable=False, index=True)
     owner_email      = Column(String, nullable=False)
     status           = Column(SAEnum(StatusEnum), default=StatusEnum.IDLE, nullable=False)
     last_online      = Column(
@@ -62,16 +77,60 @@ class Module(Base):
     port        = Column(Integer, nullable=False)
     last_online = Column(DateTime)
     status      = Column(SAEnum(StatusEnum), default=StatusEnum.IDLE, nullable=False)
-    robot_id    = Column(String, ForeignKey("robots.id"), nullable=False)
+    robot_id    = Column(String, ForeignKey("robots.id"), nullable=False, index=True)
     robot       = relationship("Robot", back_populates="modules")
 
+class Telemetry(Base):
+    __tablename__ = "telemetry"
+    id           = Column(Integer, primary_key=True, autoincrement=True)
+    module_id    = Column(String, ForeignKey("modules.id"), nullable=False, index=True)
+    channel      = Column(String, nullable=False)
+    window_start = Column(Float, nullable=False)
+    window_end   = Column(Float, nullable=False)
+    samples      = Column(Integer, nullable=False)
+    min          = Column(Float, nullable=False)
+    max          = Column(Float, nullable=False)
+    mean         = Column(Float, nullable=False)
+
 DATABASE_URL = "sqlite:///./robots.db"
 engine       = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 Session      = sessionmaker(bind=engine)
-Base.metadata.create_all(engine)
+def create_schema(engine):
+    Base.metadata.create_all(engine)
+    # create_all skips tables that already exist; add indexes missing from older DBs
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            if {c.name for c in index.columns} <= existing:
+                index.create(engine, checkfirst=True)
+
+create_schema(engine)
+
+MAX_MESSAGE = 1 << 20
+TELEMETRY   = telemetry.TelemetryStore()
+FLEET       = FleetState()
+# serializes status writes so DB rows are committed in FLEET order
+PERSIST_LOCK = threading.Lock()
+ALERTS      = alerts.AlertDispatcher()
+CAPTURE     = None
+BOARD       = None
 
-def select_or_create_robot(session):
-    robots = session.query(Robot).all()
+# module authentication: one handshake per connection, one HMAC per message
+REQUIRE_AUTH = False
+SESSIONS     = auth.SessionCache()
+CREDENTIALS  = {}
+
+def select_or_create_robot(session, selector=None):
+    if selector:
+        matches = match_robots(session, Robot, selector)
+        if len(matches) != 1:
+            print("Ambiguous robot ID" if matches else "Invalid ID"); sys.exit(1)
+        robot = matches[0]
+        return _check_password(session, robot)
+
+    # only ever look at two rows to decide between create / auto-pick / browse
+    robots = find_robots(session, Robot, limit=2)
     if not robots:
         print("No robots found; creating one:")
         data = {
@@ -82,7 +141,7 @@ def select_or_create_robot(session):
             "network_password": input("  Network password: "),
             "ip_address":       input("  Robot IP address: "),
             "port":             int(input("  Robot port: ")),
-            "password":         getpass.getpass("  Set robot password: ")
+            "password":         auth.hash_password(getpass.getpass("  Set robot password: "))
         }
         robot = Robot(**data)
         session.add(robot)
@@ -93,60 +152,326 @@ def select_or_create_robot(session):
     if len(robots) == 1:
         robot = robots[0]
     else:
-        print("Select a robot:")
-        for r in robots:
-            print(f"  {r.id}: {r.name}")
-        sel = input("Enter robot ID: ")
-        robot = session.query(Robot).get(sel)
+        robot = browse_robots(
+            session, Robot, lambda r: f"{r.id}: {r.name} ({r.owner})",
+            "Select a robot:",
+            "Enter robot ID (or prefix), /<name|owner|id prefix> to search, blank for more: "
+        )
         if not robot:
             print("Invalid ID"); sys.exit(1)
+    return _check_password(session, robot)
 
+def _check_password(session, robot):
     pw = getpass.getpass("Enter robot password: ")
-    if pw != robot.password:
+    if not auth.verify_password(pw, robot.password):
         print("Incorrect password"); sys.exit(1)
+    if auth.parse_hash(robot.password) is None:
+        # upgrade a legacy plaintext row now that we know the password
+        robot.password = auth.hash_password(pw)
+        session.commit()
+        CREDENTIALS.pop(robot.id, None)
     return robot
 
-def handle_client(conn, robot_id):
+def read_message(conn):
+    # keep reading until the buffered bytes form a complete JSON document
+    raw = b""
+    while len(raw) < MAX_MESSAGE:
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        raw += chunk
+        try:
+            return json.loads(raw.decode())
+        except ValueError:
+            continue
+    return json.loads(raw.decode())
+
+def parse_telemetry(msg):
+    """
+    {channel: [float, ...]} from a message's optional telemetry. Telemetry
+    is only an attachment: channels whose values are not finite numbers are
+    dropped rather than failing the status update.
+    """
+    telemetry = msg.get("telemetry")
+    if not isinstance(telemetry, dict):
+        return {}
+    channels = {}
+    for channel, values in telemetry.items():
+        if not isinstance(values, list):
+            values = [values]
+        try:
+            samples = [float(v) for v in values]
+        except (TypeError, ValueError):
+            continue
+        if samples and all(math.isfinite(v) for v in samples):
+            channels[str(channel)] = samples
+    return channels
+
+def persist_telemetry(sess, module_id, channel, summaries):
+    for start, end, n, lo, hi, mean in summaries:
+        sess.add(Telemetry(
+            module_id=module_id, channel=channel,
+            window_start=start, window_end=end,
+            samples=n, min=lo, max=hi, mean=mean
+        ))
+
+def flush_telemetry():
+    """Persist partially filled telemetry buffers (e.g. on shutdown)."""
+    flushed = TELEMETRY.flush()
+    if not flushed:
+        return 0
     sess = Session()
-    raw = conn.recv(1024)
     try:
-        msg             = json.loads(raw.decode())
-        module_id       = msg["module_id"]
-        incoming_status = StatusEnum[msg["status"]]
-    except Exception:
+        for module_id, channel, summaries in flushed:
+            persist_telemetry(sess, module_id, channel, summaries)
+        sess.commit()
+    finally:
         sess.close()
-        return
+    return len(flushed)
 
-    # Gather all modules for this robot
-    modules = sess.query(Module).filter_by(robot_id=robot_id).all()
+def _timestamp(dt):
+    if dt is None:
+        return 0.0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
 
-    # Determine new robot status
-    if any(m.status == StatusEnum.FAILED for m in modules):
-        robot_status = StatusEnum.FAILED
-    elif any(m.status == StatusEnum.RUNNING for m in modules):
-        robot_status = StatusEnum.RUNNING
-    else:
-        robot_status = StatusEnum.IDLE
-
-    # Update robot row
-    robot = sess.query(Robot).get(robot_id)
-    robot.status      = robot_status
-    # <<<< use full-precision UTC timestamp here >>>>
-    robot.last_online = datetime.now(timezone.utc)
-    sess.add(robot)
-    sess.commit()
-
-    # On an incoming FAILED, print alert for that module
-    if incoming_status is StatusEnum.FAILED:
-        mod = sess.query(Module).get(module_id)
-        print(
-            "\033[91mSTATUS: FAILED\033[0m  "
-            f"Module '{mod.name}' ({mod.id}) @ {mod.ip_address}:{mod.port}"
+def load_robot_state(sess, robot_id):
+    """Hydrate FLEET with a robot and its modules; reads columns, not ORM objects."""
+    row = sess.execute(
+        select(Robot.status, Robot.last_online, Robot.power_level)
+        .where(Robot.id == robot_id)
+    ).first()
+    if row is None:
+        return None
+    modules = sess.execute(
+        select(Module.id, Module.status, Module.last_online,
+               Module.name, Module.ip_address, Module.port)
+        .where(Module.robot_id == robot_id)
+    ).all()
+    with FLEET.lock:
+        rslot = FLEET.add_robot(
+            robot_id, STATUS_CODES[row.status.name],
+            _timestamp(row.last_online), row.power_level
         )
+        for m in modules:
+            FLEET.add_module(
+                m.id, rslot, STATUS_CODES[m.status.name],
+                _timestamp(m.last_online), m.name, (m.ip_address, m.port)
+            )
+    return rslot
 
-    sess.close()
+def load_module_state(sess, rslot, module_id):
+    """Add a module created after its robot was hydrated."""
+    m = sess.execute(
+        select(Module.id, Module.status, Module.last_online,
+               Module.name, Module.ip_address, Module.port)
+        .where(Module.id == module_id, Module.robot_id == FLEET.robot_ids[rslot])
+    ).first()
+    if m is None:
+        return None
+    with FLEET.lock:
+        return FLEET.add_module(
+            m.id, rslot, STATUS_CODES[m.status.name],
+            _timestamp(m.last_online), m.name, (m.ip_address, m.port)
+        )
+
+def persist_status(sess, module_id, robot_id, status, robot_status, now, power_level=None):
+    """Write-through of one state change; the only place status rows are written."""
+    sess.execute(
+        update(Module.__table__)
+        .where(Module.__table__.c.id == module_id)
+        .values(status=StatusEnum[STATUS_NAMES[status]], last_online=now)
+    )
+    values = {"status": StatusEnum[STATUS_NAMES[robot_status]], "last_online": now}
+    if power_level is not None:
+        values["power_level"] = power_level
+    sess.execute(
+        update(Robot.__table__)
+        .where(Robot.__table__.c.id == robot_id)
+        .values(**values)
+    )
+
+def publish_status(slot, module_id, status, robot_id, robot_status, stamp):
+    """Mirror one change to the status board; the board is best effort."""
+    try:
+        BOARD.update(slot, module_id, status, stamp)
+        BOARD.update_robot(robot_id, robot_status, stamp)
+    except Exception as exc:
+        # never let the board cost us the DB write
+        print(f"WARNING: status board update failed: {exc}", file=sys.stderr)
+
+def process_message(msg, robot_id):
+    if CAPTURE is not None:
+        CAPTURE.record(msg)
+    try:
+        module_id = msg["module_id"]
+        status    = STATUS_CODES[msg["status"]]
+        channels  = parse_telemetry(msg)
+    except Exception:
+        return False
+
+    sess = Session()
+    try:
+        rslot = FLEET.robot_slots.get(robot_id)
+        if rslot is None:
+            rslot = load_robot_state(sess, robot_id)
+            if rslot is None:
+                return False
+        slot = FLEET.slots.get(module_id)
+        if slot is None:
+            slot = load_module_state(sess, rslot, module_id)
+        # ignore unknown modules and modules of other robots
+        if slot is None or FLEET.robot_slot[slot] != rslot:
+            return False
+
+        power_level = channels["power_level"][-1] if channels.get("power_level") else None
+        # Computing the robot status and committing it happen under one lock:
+        # otherwise two handlers could commit their robot rows in the reverse
+        # order of their FLEET updates and leave a stale status in the DB.
+        with PERSIST_LOCK:
+            now = datetime.now(timezone.utc)
+            with FLEET.lock:
+                robot_status = FLEET.set_status(slot, status, now.timestamp())
+                if power_level is not None:
+                    FLEET.set_power(rslot, power_level)
+                # the board has a single writer; FLEET.lock serializes it
+                if BOARD is not None:
+                    publish_status(slot, module_id, status, robot_id, robot_status, now.timestamp())
+
+            persist_status(sess, module_id, robot_id, status, robot_status, now, power_level)
+
+            # Buffer numeric telemetry; only full windows reach the DB, downsampled
+            for channel, samples in channels.items():
+                summaries = TELEMETRY.push(module_id, channel, samples)
+                if summaries:
+                    persist_telemetry(sess, module_id, channel, summaries)
+            sess.commit()
+    finally:
+        sess.close()
+
+    # On an incoming FAILED, queue an alert; delivery happens off this thread
+    if STATUS_NAMES[status] == "FAILED":
+        ALERTS.submit(robot_id, module_id, FLEET.names[slot], FLEET.addrs[slot])
+    return True
+
+def robot_credential(robot_id):
+    """(iterations, salt, stored key) for a robot, cached after the first lookup."""
+    cred = CREDENTIALS.get(robot_id)
+    if cred is None:
+        sess = Session()
+        try:
+            stored = sess.execute(select(Robot.password).where(Robot.id == robot_id)).scalar()
+        finally:
+            sess.close()
+        if stored is None:
+            return None
+        # legacy plaintext rows get an in-memory hash so the handshake is the same
+        cred = auth.parse_hash(stored) or auth.parse_hash(auth.hash_password(stored))
+        CREDENTIALS[robot_id] = cred
+    return cred
+
+def _send_line(conn, obj):
+    conn.sendall(json.dumps(obj).encode("utf-8") + b"\n")
+
+def authenticate(conn, reader, robot_id, request):
+    """
+    Challenge-response against the robot's stored credential. Returns the
+    session id (its key is now in SESSIONS) or None. Socket errors (the
+    client gave up mid-handshake) propagate as OSError.
+    """
+    cred = robot_credential(robot_id)
+    if cred is None or not isinstance(request, dict):
+        return None
+    iterations, salt, stored_key = cred
+    sid          = SESSIONS.new_sid()
+    server_nonce = os.urandom(16).hex()
+    _send_line(conn, {"challenge": {
+        "sid": sid, "salt": salt.hex(), "iterations": iterations, "server_nonce": server_nonce
+    }})
+    try:
+        reply    = json.loads(reader.readline().decode("utf-8"))
+        auth_msg = auth.auth_message(str(request["client_nonce"]), server_nonce, sid)
+        ckey     = auth.check_proof(stored_key, auth_msg, bytes.fromhex(reply["proof"]))
+    except (ValueError, KeyError, TypeError):
+        return None
+    if ckey is None:
+        return None
+    SESSIONS.add(sid, auth.session_key(ckey, auth_msg))
+    return sid
+
+def serve_stream(conn, robot_id, hello):
+    """
+    Persistent connection from a module agent: after the hello is answered,
+    every newline-terminated JSON line is one status message, acknowledged
+    with an {"ack": n} line once handled (n counts lines on this
+    connection). With an authenticated session each line is a signed frame
+    (see auth.sign).
+    """
+    with conn.makefile("rb") as reader:
+        sid = None
+        try:
+            if "auth" in hello:
+                sid = authenticate(conn, reader, robot_id, hello["auth"])
+                if sid is None:
+                    _send_line(conn, {"ready": False, "error": "authentication failed"})
+                    return
+            elif REQUIRE_AUTH:
+                _send_line(conn, {"ready": False, "error": "authentication required"})
+                return
+        except OSError:
+            # the client aborted the handshake: no session, and nobody to refuse
+            return
+        try:
+            _send_line(conn, {"ready": True, "sid": sid, "ttl": SESSIONS.ttl if sid else None})
+            for n, line in enumerate(reader, start=1):
+                try:
+                    msg = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    _send_line(conn, {"ack": n})
+                    continue
+                if sid is not None:
+                    # frames must belong to this connection's own session
+                    msg = SESSIONS.verify(msg) if isinstance(msg, dict) and msg.get("sid") == sid else None
+                    if msg is None:
+                        # bad MAC, replay or expired session: make the agent re-authenticate
+                        _send_line(conn, {"error": "invalid or expired session"})
+                        return
+                process_message(msg, robot_id)
+                _send_line(conn, {"ack": n})
+        except OSError:
+            # the agent went away (reset, broken pipe); it resends unacked lines
+            return
+        finally:
+            if sid is not None:
+                SESSIONS.drop(sid)
+
+def handle_client(conn, robot_id):
+    try:
+        msg = read_message(conn)
+    except Exception:
+        return
+    # a one-shot status message, or the hello that opens an agent stream
+    if isinstance(msg, dict) and "hello" in msg:
+        serve_stream(conn, robot_id, msg)
+        return
+    if REQUIRE_AUTH:
+        return
+    process_message(msg, robot_id)
+
+def serve_connection(conn, robot_id):
+    # closing only after processing lets senders wait for EOF as an ack
+    with conn:
+        handle_client(conn, robot_id)
 
 def socket_server(robot):
+    sess = Session()
+    rslot = load_robot_state(sess, robot.id)
+    sess.close()
+    if BOARD is not None:
+        with FLEET.lock:
+            BOARD.publish_fleet(FLEET, rslot)
+
     srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     srv.bind((robot.ip_address, robot.port))
@@ -154,10 +479,74 @@ def socket_server(robot):
     print(f"Listening on {robot.ip_address}:{robot.port}")
     while True:
         conn, _ = srv.accept()
-        threading.Thread(target=handle_client, args=(conn, robot.id), daemon=True).start()
+        threading.Thread(target=serve_connection, args=(conn, robot.id), daemon=True).start()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Robot status server")
+    parser.add_argument("--alert-log", metavar="PATH",
+                        help="also append FAILED alerts as JSON lines to PATH")
+    parser.add_argument("--alert-webhook", metavar="URL",
+                        help="also POST batches of FAILED alerts to URL")
+    parser.add_argument("--alert-window", type=float, default=30.0, metavar="SECONDS",
+                        help="suppress repeated alerts for a module within this window")
+    parser.add_argument("--alert-rate", type=int, default=10, metavar="N",
+                        help="at most N alerts per robot per minute")
+    parser.add_argument("--robot", metavar="ID",
+                        help="robot id (or unique id prefix) to run, skipping the picker")
+    parser.add_argument("--capture", metavar="PATH",
+                        help="record every incoming message with its arrival time to PATH")
+    parser.add_argument("--status-board", metavar="PATH",
+                        help="maintain a memory-mapped module status board at PATH")
+    parser.add_argument("--status-board-capacity", type=int, default=4096, metavar="N",
+                        help="number of module records in the status board")
+    parser.add_argument("--replicate", metavar="HOST:PORT",
+                        help="ship changed module/robot rows to an aggregator")
+    parser.add_argument("--require-auth", action="store_true",
+                        help="only accept status updates over authenticated agent sessions")
+    parser.add_argument("--session-ttl", type=float, default=3600.0, metavar="SECONDS",
+                        help="lifetime of an authenticated module session")
+    parser.add_argument("--db", metavar="URL", default=DATABASE_URL,
+                        help=f"database URL (default {DATABASE_URL})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    global ALERTS, CAPTURE, BOARD, REQUIRE_AUTH, SESSIONS, engine, Session
+    args  = parse_args(argv)
+    if args.db != DATABASE_URL:
+        engine  = create_engine(args.db, connect_args={"check_same_thread": False})
+        Session = sessionmaker(bind=engine)
+        create_schema(engine)
+    if args.capture:
+        CAPTURE = capture.CaptureWriter(args.capture)
+    REQUIRE_AUTH = args.require_auth
+    SESSIONS     = auth.SessionCache(ttl=args.session_ttl)
+    if args.status_board:
+        BOARD = statusboard.StatusBoard(args.status_board, args.status_board_capacity)
+
+    sinks = [alerts.StdoutSink()]
+    if args.alert_log:
+        sinks.append(alerts.LogFileSink(args.alert_log))
+    if args.alert_webhook:
+        sinks.append(alerts.WebhookSink(args.alert_webhook))
+    ALERTS = alerts.AlertDispatcher(
+        sinks, dedup_window=args.alert_window, robot_rate=args.alert_rate
+    )
+    ALERTS.start()
 
-if __name__ == "__main__":
     sess = Session()
-    robo = select_or_create_robot(sess)
+    robo = select_or_create_robot(sess, args.robot)
     print(f"Running robot '{robo.name}' [{robo.id}]  (status={robo.status.name})")
-    socket_server(robo)
+    if args.replicate:
+        host, _, port = args.replicate.rpartition(":")
+        Replicator(FLEET, host or "127.0.0.1", int(port), robo.id).start()
+    try:
+        socket_server(robo)
+    finally:
+        # partial windows (e.g. one power_level per message) would be lost otherwise
+        flush_telemetry()
+        if CAPTURE is not None:
+            CAPTURE.close()
+            print(f"Captured {CAPTURE.count} messages to {args.capture}")
+
+if __name__ == "__main__":
+    main()
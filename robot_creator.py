@@ -10,6 +10,11 @@ from sqlalchemy import (
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+try:
+    from . import auth
+except ImportError:
+    import auth
+
 Base = declarative_base()
 
 class StatusEnum(enum.Enum):
@@ -20,8 +25,8 @@ class StatusEnum(enum.Enum):
 class Robot(Base):
     __tablename__ = "robots"
     id               = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    name             = Column(String, nullable=False)
-    owner            = Column(String, nullable=False)
+    name             = Column(String, nullable=False, index=True)
+    owner            = Column(String, nullable=False, index=True)
     owner_email      = Column(String, nullable=False)
     status           = Column(SAEnum(StatusEnum), default=StatusEnum.IDLE, nullable=False)
     last_online      = Column(DateTime(timezone=True),default=lambda: datetime.now(timezone.utc).replace(microsecond=0),nullable=False)
@@ -71,7 +76,7 @@ def main():
         network_password=pwd,
         ip_address=ip,
         port=port,
-        password=passwd
+        password=auth.hash_password(passwd)
     )
     sess.add(robot)
     sess.commit()
@@ -0,0 +1,63 @@
+from sqlalchemy import and_, or_
+
+PAGE_SIZE = 20
+
+# upper bound for "starts with" range scans; unlike LIKE, a range can use the index
+_MAX_CHAR = "\U0010ffff"
+
+def _starts_with(column, prefix):
+    return and_(column >= prefix, column < prefix + _MAX_CHAR)
+
+# columns a `/search` in the picker matches, where the model has them
+SEARCH_FIELDS = ("id", "name", "owner")
+
+def find_robots(session, model, prefix=None, after=None, limit=PAGE_SIZE, fields=SEARCH_FIELDS):
+    """
+    One page of robots ordered by id (keyset pagination: pass the last id
+    of the previous page as `after`). `prefix` matches the start of any of
+    `fields` the model has (by default the id, name or owner).
+    """
+    q = session.query(model).order_by(model.id)
+    if prefix:
+        conds = [_starts_with(getattr(model, col), prefix) for col in fields if hasattr(model, col)]
+        q = q.filter(or_(*conds))
+    if after is not None:
+        q = q.filter(model.id > after)
+    return q.limit(limit).all()
+
+def match_robots(session, model, selector, limit=2):
+    """Exact id first, then id prefix matches (never name/owner); at most `limit` robots."""
+    robot = session.get(model, selector)
+    if robot is not None:
+        return [robot]
+    return find_robots(session, model, prefix=selector, limit=limit, fields=("id",))
+
+def browse_robots(session, model, describe, header, prompt):
+    """
+    Interactive paged picker. Blank input shows the next page, `/text`
+    searches by prefix, anything else is resolved as an id (or a unique
+    prefix). Returns the chosen robot or None.
+    """
+    print(header)
+    prefix, after = None, None
+    while True:
+        page = find_robots(session, model, prefix=prefix, after=after)
+        for r in page:
+            print(f"  {describe(r)}")
+        if len(page) < PAGE_SIZE:
+            print("  (end of list)")
+            after = None
+        else:
+            after = page[-1].id
+
+        sel = input(prompt).strip()
+        if not sel:
+            continue
+        if sel.startswith("/"):
+            prefix, after = sel[1:] or None, None
+            continue
+        matches = match_robots(session, model, sel)
+        if len(matches) > 1:
+            print(f"'{sel}' matches several robots; type more of the id")
+            continue
+        return matches[0] if matches else None
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import mmap
+import struct
+import sys
+import time
+from datetime import datetime, timezone
+
+try:
+    from .fleet_state import STATUS_NAMES
+except ImportError:
+    from fleet_state import STATUS_NAMES
+
+# File layout: HEADER | robot record | `capacity` module records.
+# Each record is guarded by a seqlock counter: the writer makes it odd
+# before touching the body and even again afterwards, so a reader that
+# sees the same even value before and after reading has a consistent copy.
+MAGIC   = b"RSTB"
+VERSION = 1
+HEADER  = struct.Struct("<4sIII")        # magic, version, capacity, count
+SEQ     = struct.Struct("<I")
+ID_SIZE = 36                             # a canonical UUID string
+BODY    = struct.Struct(f"<b3xd{ID_SIZE}s")   # status, last_online (epoch), id
+RECORD_SIZE = SEQ.size + BODY.size
+
+def _offset(slot):
+    # slot -1 is the robot record
+    return HEADER.size + (slot + 1) * RECORD_SIZE
+
+class StatusBoard:
+    """Single-writer side, owned by the robot server."""
+
+    def __init__(self, path, capacity=4096):
+        self.path     = path
+        self.capacity = capacity
+        self.count    = 0
+        self.overflow = 0
+        self.rejected = set()
+        size = _offset(capacity)
+        with open(path, "wb") as fh:
+            fh.truncate(size)
+        self._fh = open(path, "r+b")
+        self.mm  = mmap.mmap(self._fh.fileno(), size)
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, capacity, 0)
+
+    def _encode(self, ident):
+        """The id as record bytes, or None (warned once) if it cannot be stored intact."""
+        try:
+            raw = ident.encode("ascii")
+        except UnicodeEncodeError:
+            raw = None
+        if raw is None or len(raw) > ID_SIZE:
+            if ident not in self.rejected:
+                self.rejected.add(ident)
+                print(f"WARNING: status board {self.path}: id {ident!r} is not ASCII or longer "
+                      f"than {ID_SIZE} bytes; not published", file=sys.stderr)
+            return None
+        return raw
+
+    def _write(self, slot, ident, status, last_online):
+        # everything that can fail happens before the counter goes odd
+        body = BODY.pack(status, last_online, ident)
+        off  = _offset(slot)
+        seq  = SEQ.unpack_from(self.mm, off)[0]
+        SEQ.pack_into(self.mm, off, (seq + 1) & 0xFFFFFFFF)
+        self.mm[off + SEQ.size:off + RECORD_SIZE] = body
+        # 0 means "never written", so wrap around to 2
+        SEQ.pack_into(self.mm, off, (seq + 2) & 0xFFFFFFFF or 2)
+
+    def update(self, slot, module_id, status, last_online):
+        if slot >= self.capacity:
+            if not self.overflow:
+                print(f"WARNING: status board {self.path} is full ({self.capacity} modules); "
+                      "later modules are not published, raise its capacity", file=sys.stderr)
+            self.overflow += 1
+            return False
+        ident = self._encode(module_id)
+        if ident is None:
+            return False
+        self._write(slot, ident, status, last_online)
+        if slot >= self.count:
+            self.count = slot + 1
+            HEADER.pack_into(self.mm, 0, MAGIC, VERSION, self.capacity, self.count)
+        return True
+
+    def update_robot(self, robot_id, status, last_online):
+        ident = self._encode(robot_id)
+        if ident is None:
+            return False
+        self._write(-1, ident, status, last_online)
+        return True
+
+    def publish_fleet(self, fleet, robot_slot=0):
+        """Write every module slot (and one robot) of a FleetState."""
+        for slot, module_id in enumerate(fleet.ids):
+            self.update(slot, module_id, fleet.status[slot], fleet.last_online[slot])
+        if robot_slot < len(fleet.robot_ids):
+            self.update_robot(fleet.robot_ids[robot_slot], fleet.robot_status[robot_slot],
+                              fleet.robot_last_online[robot_slot])
+
+    def close(self):
+        self.mm.close()
+        self._fh.close()
+
+class StatusBoardReader:
+    """Lock-free reader for other local processes; never touches the DB."""
+
+    def __init__(self, path):
+        self._fh = open(path, "rb")
+        self.mm  = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.capacity, _ = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a status board")
+        self._index   = {}
+        self._scanned = 0
+
+    @property
+    def count(self):
+        return HEADER.unpack_from(self.mm, 0)[3]
+
+    def _read(self, slot, retries=1000):
+        off = _offset(slot)
+        for _ in range(retries):
+            before = SEQ.unpack_from(self.mm, off)[0]
+            if not before & 1:
+                status, last_online, ident = BODY.unpack_from(self.mm, off + SEQ.size)
+                if SEQ.unpack_from(self.mm, off)[0] == before:
+                    if before == 0:
+                        return None   # never written
+                    return ident.rstrip(b"\0").decode("ascii"), STATUS_NAMES[status], last_online
+            # let the writer finish (it may be a thread in this same process)
+            time.sleep(0)
+        raise RuntimeError(f"slot {slot} kept changing while being read")
+
+    def read(self, slot):
+        """(id, status name, last_online epoch) for a module slot, or None."""
+        return self._read(slot)
+
+    def robot(self):
+        return self._read(-1)
+
+    def find(self, module_id):
+        slot = self._index.get(module_id)
+        if slot is None:
+            # slots never change owner, so positions found once stay valid
+            count = self.count
+            for slot in range(self._scanned, count):
+                rec = self._read(slot)
+                if rec is not None:
+                    self._index[rec[0]] = slot
+            self._scanned = count
+            slot = self._index.get(module_id)
+        return None if slot is None else self._read(slot)
+
+    def snapshot(self):
+        return [rec for rec in map(self._read, range(self.count)) if rec is not None]
+
+    def close(self):
+        self.mm.close()
+        self._fh.close()
+
+def _fmt(stamp):
+    return datetime.fromtimestamp(stamp, timezone.utc).isoformat() if stamp else "-"
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: statusboard <board_path>")
+        sys.exit(1)
+    board = StatusBoardReader(sys.argv[1])
+    rec = board.robot()
+    if rec:
+        print(f"Robot {rec[0]}  status={rec[1]}  last_online={_fmt(rec[2])}")
+    for module_id, status, last_online in board.snapshot():
+        print(f"  {module_id}  {status:<8} {_fmt(last_online)}")
+    board.close()
@@ -0,0 +1,116 @@
+import threading
+import time
+from array import array
+
+DEFAULT_CAPACITY     = 1024
+DEFAULT_BUCKET       = 64
+DEFAULT_MAX_CHANNELS = 16
+
+class RingBuffer:
+    """Preallocated ring of float samples (plus receive times) for one channel."""
+    __slots__ = ("capacity", "values", "stamps", "head", "count")
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.values   = array("d", bytes(8 * capacity))
+        self.stamps   = array("d", bytes(8 * capacity))
+        self.head     = 0
+        self.count    = 0
+
+    def push(self, samples, stamp):
+        for v in samples:
+            idx = (self.head + self.count) % self.capacity
+            self.values[idx] = v
+            self.stamps[idx] = stamp
+            if self.count < self.capacity:
+                self.count += 1
+            else:
+                # full: overwrite the oldest sample
+                self.head = (self.head + 1) % self.capacity
+        return self.count
+
+    def drain(self):
+        """Return (values, stamps) in arrival order and reset the ring."""
+        end = self.head + self.count
+        if end <= self.capacity:
+            values = self.values[self.head:end]
+            stamps = self.stamps[self.head:end]
+        else:
+            wrap   = end - self.capacity
+            values = self.values[self.head:] + self.values[:wrap]
+            stamps = self.stamps[self.head:] + self.stamps[:wrap]
+        self.head  = 0
+        self.count = 0
+        return values, stamps
+
+def downsample(values, stamps, bucket=DEFAULT_BUCKET):
+    """Collapse samples into fixed-size buckets of (start, end, n, min, max, mean)."""
+    out = []
+    for lo in range(0, len(values), bucket):
+        chunk = values[lo:lo + bucket]
+        n     = len(chunk)
+        out.append((
+            stamps[lo],
+            stamps[lo + n - 1],
+            n,
+            min(chunk),
+            max(chunk),
+            sum(chunk) / n,
+        ))
+    return out
+
+class TelemetryStore:
+    """
+    Per (module_id, channel) ring buffers, flushed as downsampled summaries.
+    Safe to share between connection handler threads.
+
+    Channel names come from the senders, so each module gets at most
+    `max_channels` buffers; samples for further channels are rejected.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, bucket=DEFAULT_BUCKET,
+                 max_channels=DEFAULT_MAX_CHANNELS):
+        self.capacity     = capacity
+        self.bucket       = bucket
+        self.max_channels = max_channels
+        self.buffers      = {}
+        self.channels     = {}   # module_id -> number of buffers
+        self.rejected     = 0
+        self.lock         = threading.Lock()
+
+    def push(self, module_id, channel, samples, stamp=None):
+        """
+        Append samples to a channel buffer. Each time the buffer fills it is
+        drained and downsampled, so no sample is overwritten; returns the
+        summaries of every window completed by this push (often none).
+        Samples for a new channel beyond the module's limit are dropped.
+        """
+        if isinstance(samples, (int, float)):
+            samples = (samples,)
+        key   = (module_id, channel)
+        stamp = time.time() if stamp is None else stamp
+        out   = []
+        with self.lock:
+            buf = self.buffers.get(key)
+            if buf is None:
+                if self.channels.get(module_id, 0) >= self.max_channels:
+                    self.rejected += 1
+                    return out
+                self.channels[module_id] = self.channels.get(module_id, 0) + 1
+                buf = self.buffers[key] = RingBuffer(self.capacity)
+            lo = 0
+            while lo < len(samples):
+                room = self.capacity - buf.count
+                if buf.push(samples[lo:lo + room], stamp) == self.capacity:
+                    out.extend(downsample(*buf.drain(), bucket=self.bucket))
+                lo += room
+        return out
+
+    def flush(self):
+        """Drain every non-empty buffer; returns [(module_id, channel, summaries)]."""
+        with self.lock:
+            return [
+                (module_id, channel, downsample(*buf.drain(), bucket=self.bucket))
+                for (module_id, channel), buf in self.buffers.items()
+                if buf.count
+            ]
@@ -0,0 +1,98 @@
+import socket
+import threading
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from .. import auth, module, robot
+
+@pytest.fixture
+def robot_db(tmp_path, monkeypatch):
+    """
+    Point robot.py and module.py at a fresh file DB (so server threads share
+    it) and give the robot server fresh in-memory state. Yields the DB URL.
+    """
+    url = f"sqlite:///{tmp_path / 'robots.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Session = sessionmaker(bind=engine)
+    robot.create_schema(engine)
+    for target in (robot, module):
+        monkeypatch.setattr(target, "engine", engine)
+        monkeypatch.setattr(target, "Session", Session)
+    monkeypatch.setattr(robot, "FLEET", robot.FleetState())
+    monkeypatch.setattr(robot, "TELEMETRY", robot.telemetry.TelemetryStore())
+    monkeypatch.setattr(robot, "ALERTS", robot.alerts.AlertDispatcher(batch_interval=0.01))
+    monkeypatch.setattr(robot, "SESSIONS", auth.SessionCache())
+    monkeypatch.setattr(robot, "CREDENTIALS", {})
+    yield url
+    # let this test's alerts drain before the next test captures output
+    robot.ALERTS.flush()
+
+def make_robot(session, module_statuses, port=9000, password="pw"):
+    """
+    Insert one Robot plus one Module per status in module_statuses.
+    module_statuses: list of strings, e.g. ["IDLE","RUNNING","FAILED"]
+    """
+    bot = robot.Robot(
+        name="TestBot",
+        owner="alice",
+        owner_email="alice@example.com",
+        network_ssid="net",
+        network_password="pw",
+        ip_address="127.0.0.1",
+        port=port,
+        password=password
+    )
+    session.add(bot)
+    session.commit()
+
+    mods = []
+    for i, st in enumerate(module_statuses, start=1):
+        m = robot.Module(
+            name=f"mod{i}",
+            type=robot.ModuleType.VISION,
+            ip_address=f"10.0.0.{i}",
+            port=1000 + i,
+            status=robot.StatusEnum[st],
+            robot_id=bot.id
+        )
+        session.add(m)
+        mods.append(m)
+    session.commit()
+    return bot, mods
+
+@pytest.fixture
+def robot_server(robot_db):
+    """
+    A robot server on an ephemeral port for one robot with six IDLE modules
+    (password "pw", hashed cheaply). Yields its port, DB url, robot and
+    module ids, and the accepted connections and their handler threads.
+    """
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(64)
+    port = srv.getsockname()[1]
+
+    sess = robot.Session()
+    bot, mods = make_robot(sess, ["IDLE"] * 6, port=port,
+                           password=auth.hash_password("pw", iterations=1000))
+    server = SimpleNamespace(port=port, url=robot_db, bot_id=bot.id,
+                             ids=[m.id for m in mods], conns=[], handlers=[])
+    sess.close()
+
+    def serve():
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                return
+            t = threading.Thread(target=robot.serve_connection, args=(conn, server.bot_id), daemon=True)
+            server.conns.append(conn)
+            server.handlers.append(t)
+            t.start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield server
+    srv.close()
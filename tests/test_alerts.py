@@ -0,0 +1,79 @@
+import json
+import threading
+
+from .. import alerts
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+class ListSink:
+    def __init__(self):
+        self.batches = []
+    def emit(self, batch):
+        self.batches.append(list(batch))
+
+class BrokenSink:
+    def emit(self, batch):
+        raise RuntimeError("sink down")
+
+def _alert(robot_id="r1", module_id="m1"):
+    return alerts.Alert(robot_id, module_id, "mod", ("10.0.0.1", 1001), 0.0, 0)
+
+def test_dedupes_within_window_and_reports_repeats():
+    clock = FakeClock()
+    d = alerts.AlertDispatcher(sinks=[], dedup_window=10.0, clock=clock)
+
+    assert d._admit(_alert()) is not None
+    clock.now = 5.0
+    assert d._admit(_alert()) is None
+    assert d._admit(_alert()) is None
+    clock.now = 11.0
+    again = d._admit(_alert())
+    assert again is not None and again.suppressed == 2
+
+def test_rate_limits_per_robot():
+    clock = FakeClock()
+    d = alerts.AlertDispatcher(sinks=[], dedup_window=0.0, robot_rate=2, rate_period=60.0, clock=clock)
+
+    admitted = [d._admit(_alert(module_id=f"m{i}")) for i in range(4)]
+    assert sum(a is not None for a in admitted) == 2
+    assert d.rate_limited == 2
+    # other robots have their own budget
+    assert d._admit(_alert(robot_id="r2", module_id="x")) is not None
+    # tokens refill over time
+    clock.now = 30.0
+    assert d._admit(_alert(module_id="m9")) is not None
+
+def test_worker_batches_to_all_sinks_and_survives_errors(tmp_path):
+    sink = ListSink()
+    log  = tmp_path / "alerts.log"
+    d = alerts.AlertDispatcher(
+        sinks=[BrokenSink(), sink, alerts.LogFileSink(str(log))],
+        batch_interval=0.05
+    )
+    for i in range(3):
+        d.submit("r1", f"m{i}", "mod", ("10.0.0.1", 1001))
+    d.flush()
+
+    assert sum(len(b) for b in sink.batches) == 3
+    assert d.errors >= 1
+    lines = [json.loads(l) for l in log.read_text().splitlines()]
+    assert [l["module_id"] for l in lines] == ["m0", "m1", "m2"]
+
+def test_submit_never_blocks_when_queue_full():
+    gate = threading.Event()
+
+    class SlowSink:
+        def emit(self, batch):
+            gate.wait()
+
+    d = alerts.AlertDispatcher(sinks=[SlowSink()], dedup_window=0.0, batch_size=1,
+                               batch_interval=0.0, max_queue=2)
+    results = [d.submit("r1", f"m{i}") for i in range(10)]
+    assert not all(results)
+    assert d.dropped >= 1
+    gate.set()
+    d.flush()
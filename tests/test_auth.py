@@ -0,0 +1,64 @@
+from .. import auth
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def test_hash_and_verify_password():
+    stored = auth.hash_password("hunter2", iterations=1000)
+    assert stored.startswith("pbkdf2_sha256$1000$")
+    assert "hunter2" not in stored
+    assert auth.verify_password("hunter2", stored)
+    assert not auth.verify_password("hunter3", stored)
+    # same password, different salt
+    assert auth.hash_password("hunter2", iterations=1000) != stored
+
+def test_verify_legacy_plaintext():
+    assert auth.parse_hash("pw") is None
+    assert auth.verify_password("pw", "pw")
+    assert not auth.verify_password("nope", "pw")
+
+def test_proof_roundtrip_without_pbkdf2_on_server():
+    stored = auth.hash_password("secret", iterations=1000)
+    iterations, salt, stored_key = auth.parse_hash(stored)
+    ckey = auth.client_key(auth.salted_password("secret", salt, iterations))
+    msg  = auth.auth_message("cnonce", "snonce", "sid1")
+
+    assert auth.check_proof(stored_key, msg, auth.make_proof(ckey, msg)) == ckey
+    # a proof is bound to its nonces
+    other = auth.auth_message("cnonce", "other", "sid1")
+    assert auth.check_proof(stored_key, other, auth.make_proof(ckey, msg)) is None
+    # wrong password
+    bad = auth.client_key(auth.salted_password("guess", salt, iterations))
+    assert auth.check_proof(stored_key, msg, auth.make_proof(bad, msg)) is None
+
+def test_session_cache_verifies_mac_sequence_and_expiry():
+    clock = FakeClock()
+    cache = auth.SessionCache(ttl=10.0, clock=clock)
+    key = b"k" * 32
+    cache.add("s1", key)
+    msg = {"module_id": "m1", "status": "RUNNING"}
+
+    assert cache.verify(auth.sign(key, "s1", 1, msg)) == msg
+    # replayed or reordered frame
+    assert cache.verify(auth.sign(key, "s1", 1, msg)) is None
+    # tampered message
+    frame = auth.sign(key, "s1", 2, msg)
+    frame["msg"] = {"module_id": "m1", "status": "FAILED"}
+    assert cache.verify(frame) is None
+    # wrong key / unknown session
+    assert cache.verify(auth.sign(b"x" * 32, "s1", 3, msg)) is None
+    assert cache.verify(auth.sign(key, "s2", 3, msg)) is None
+    assert cache.verify({"msg": msg}) is None
+    # malformed MACs are rejected, not raised
+    for mac in ("é" * 64, 123, None, ["x"]):
+        frame = auth.sign(key, "s1", 3, msg)
+        frame["mac"] = mac
+        assert cache.verify(frame) is None
+
+    assert cache.verify(auth.sign(key, "s1", 3, msg)) == msg
+    clock.now = 10.0
+    assert cache.verify(auth.sign(key, "s1", 4, msg)) is None
+    assert "s1" not in cache.sessions
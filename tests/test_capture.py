@@ -0,0 +1,73 @@
+import pytest
+
+from .. import capture, replay, robot
+
+def test_capture_roundtrip_and_truncated_tail(tmp_path):
+    path = tmp_path / "traffic.rcap"
+    w = capture.CaptureWriter(str(path))
+    w.record({"module_id": "m1", "status": "RUNNING"}, stamp=w.start + 0.5)
+    w.record({"module_id": "m2", "status": "FAILED"}, stamp=w.start + 1.25)
+    w.close()
+
+    # simulate an interrupted capture: half a record at the end
+    with open(path, "ab") as fh:
+        fh.write(capture.RECORD.pack(2.0, 100) + b'{"mod')
+
+    start, records = capture.read_capture(str(path))
+    assert start == w.start
+    assert records == [
+        (0.5, {"module_id": "m1", "status": "RUNNING"}),
+        (1.25, {"module_id": "m2", "status": "FAILED"}),
+    ]
+
+def test_read_capture_rejects_other_files(tmp_path):
+    path = tmp_path / "not.rcap"
+    path.write_bytes(b"x" * 32)
+    with pytest.raises(ValueError):
+        capture.read_capture(str(path))
+
+def test_expected_final_state_and_divergence():
+    records = [
+        (0.0, {"module_id": "a", "status": "RUNNING"}),
+        (0.1, {"module_id": "b", "status": "IDLE"}),
+        (0.2, {"module_id": "a", "status": "FAILED"}),
+        (0.3, {"module_id": "b", "status": "BOGUS"}),
+        (0.4, {"status": "IDLE"}),
+    ]
+    expected = replay.expected_final_state(records)
+    assert expected == {"a": "FAILED", "b": "IDLE"}
+    assert replay.divergence(expected, {"a": "FAILED", "b": "IDLE"}) == {}
+    assert replay.divergence(expected, {"a": "RUNNING"}) == {
+        "a": ("FAILED", "RUNNING"),
+        "b": ("IDLE", None),
+    }
+
+def test_capture_then_replay_reproduces_final_state(tmp_path, monkeypatch, robot_server):
+    bot_id, ids = robot_server.bot_id, robot_server.ids
+    path = tmp_path / "traffic.rcap"
+    writer = capture.CaptureWriter(str(path))
+    monkeypatch.setattr(robot, "CAPTURE", writer)
+
+    statuses = ["RUNNING", "FAILED", "IDLE"]
+    for step in range(3):
+        for i, mid in enumerate(ids):
+            robot.process_message({"module_id": mid, "status": statuses[(i + step) % 3]}, bot_id)
+    writer.close()
+    monkeypatch.setattr(robot, "CAPTURE", None)
+
+    _, records = capture.read_capture(str(path))
+    assert len(records) == 18
+
+    # reset the server's view and the DB, then replay at max speed
+    monkeypatch.setattr(robot, "FLEET", robot.FleetState())
+    sess = robot.Session()
+    sess.query(robot.Module).update({"status": robot.StatusEnum.IDLE})
+    sess.commit()
+    sess.close()
+    stats = replay.replay(records, "127.0.0.1", robot_server.port, speed=0, concurrency=4)
+    for t in list(robot_server.handlers):
+        t.join(timeout=5)
+
+    assert stats["sent"] == 18 and stats["errors"] == 0
+    expected = replay.expected_final_state(records)
+    assert replay.divergence(expected, replay.load_db_state(robot_server.url, expected)) == {}
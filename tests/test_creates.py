@@ -5,6 +5,7 @@ import pytest
 from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import sessionmaker
 
+from .. import auth
 from .. import module_creator
 from .. import robot_creator
 
@@ -74,7 +75,9 @@ def test_robot_main_creates_robot(monkeypatch, capsys):
     assert r.network_password == "TestNetPass"
     assert r.ip_address == "10.0.0.42"
     assert r.port == 4242
-    assert r.password == "s3cretpw"
+    # stored salted and slow-hashed, never in plaintext
+    assert r.password != "s3cretpw"
+    assert auth.verify_password("s3cretpw", r.password)
 
     out = capsys.readouterr().out
     assert "Created Robot 'Robo1'" in out
@@ -95,6 +98,20 @@ def test_choose_robot(monkeypatch, capsys):
     assert "robotX" in out
     assert rid == "robotX"
 
+def test_choose_robot_by_selector(capsys):
+    sess = module_creator.Session()
+    sess.add_all([module_creator.Robot(id="abc-1"), module_creator.Robot(id="abc-2")])
+    sess.commit()
+
+    assert module_creator.choose_robot(sess, "abc-1") == "abc-1"
+    assert module_creator.choose_robot(sess, "nope") is None
+    assert module_creator.choose_robot(sess, "abc") is None
+    assert "Ambiguous robot ID" in capsys.readouterr().out
+
+    module_creator.main("nope")
+    assert "No such robot." in capsys.readouterr().out
+    sess.close()
+
 def test_module_main_creates_module(monkeypatch, capsys):
     # prep a robot for modules to attach to
     sess = module_creator.Session()
@@ -102,7 +119,7 @@ def test_module_main_creates_module(monkeypatch, capsys):
     sess.commit()
 
     # bypass choose_robot prompt
-    monkeypatch.setattr(module_creator, "choose_robot", lambda sess_arg: "robotY")
+    monkeypatch.setattr(module_creator, "choose_robot", lambda sess_arg, selector=None: "robotY")
 
     # inputs: name, type, ip, port, status
     inputs = iter([
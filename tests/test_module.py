@@ -147,3 +147,37 @@ def test_status_loop_updates_and_sends(monkeypatch, capsys):
     assert sock.connected_to == ("127.0.0.1", 9999)
     expected = {"module_id": mid, "status": "FAILED"}
     assert sock.sent_data == json.dumps(expected).encode("utf-8")
+
+def test_status_with_telemetry(monkeypatch, capsys):
+    sess = module.Session()
+    rid = str(uuid.uuid4())
+    sess.add(module.Robot(id=rid, ip_address="127.0.0.1", port=9999))
+    mid = str(uuid.uuid4())
+    sess.add(module.Module(
+        id=mid, name="ModA", type=module.ModuleType.IMU, ip_address="5.6.7.8", port=2222,
+        last_online=datetime.now(timezone.utc), status=module.StatusEnum.IDLE, robot_id=rid
+    ))
+    sess.commit()
+    monkeypatch.setattr(sys, "argv", ["prog", mid])
+
+    inputs = iter(["RUNNING accel_x", "running power_level=0.8 accel_x=1,2.5", KeyboardInterrupt()])
+    def fake_input(prompt=""):
+        val = next(inputs)
+        if isinstance(val, Exception):
+            raise val
+        return val
+    monkeypatch.setattr(builtins, "input", fake_input)
+    created = []
+    def fake_socket(*args, **kwargs):
+        s = FakeSocket()
+        created.append(s)
+        return s
+    monkeypatch.setattr(module.socket, "socket", fake_socket)
+
+    module.main()
+
+    assert "Invalid telemetry:" in capsys.readouterr().out
+    assert len(created) == 1
+    expected = {"module_id": mid, "status": "RUNNING",
+                "telemetry": {"power_level": 0.8, "accel_x": [1.0, 2.5]}}
+    assert json.loads(created[0].sent_data) == expected
@@ -0,0 +1,229 @@
+import json
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from .. import auth, module, module_agent, robot
+
+def _wait_for(pred, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if pred():
+            return True
+        time.sleep(0.01)
+    return False
+
+def _robot_status(bot_id):
+    sess = robot.Session()
+    try:
+        return sess.get(robot.Robot, bot_id).status
+    finally:
+        sess.close()
+
+def test_agent_multiplexes_modules_over_one_connection(robot_server):
+    bot_id, ids, conns = robot_server.bot_id, robot_server.ids, robot_server.conns
+    sess = module.Session()
+    bot = sess.query(module.Robot).filter_by(id=bot_id).first()
+    agent = module_agent.ModuleAgent(sess, bot, ids)
+
+    for mid in ids:
+        agent.post(mid, "RUNNING")
+    agent.post(ids[2], "FAILED", telemetry={"power_level": 0.3})
+
+    assert _wait_for(lambda: _robot_status(bot_id) == robot.StatusEnum.FAILED)
+    assert len(conns) == 1
+
+    rslot = robot.FLEET.robot_slots[bot_id]
+    assert list(robot.FLEET.counts[rslot]) == [0, 5, 1]
+    assert robot.FLEET.robot_power[rslot] == pytest.approx(0.3)
+
+    # the agent's single shared session wrote the module rows too
+    check = module.Session()
+    assert check.query(module.Module).filter_by(id=ids[2]).first().status == module.StatusEnum.FAILED
+    check.close()
+    agent.close()
+    sess.close()
+
+def test_agent_resends_after_robot_drops_connection(robot_server):
+    bot_id, ids, conns = robot_server.bot_id, robot_server.ids, robot_server.conns
+    sess = module.Session()
+    bot = sess.query(module.Robot).filter_by(id=bot_id).first()
+    agent = module_agent.ModuleAgent(sess, bot, ids)
+
+    agent.post(ids[0], "RUNNING")
+    assert _robot_status(bot_id) == robot.StatusEnum.RUNNING
+    # the robot side goes away without the agent noticing
+    conns[0].shutdown(socket.SHUT_RDWR)
+
+    agent.post(ids[1], "FAILED")
+    assert len(conns) == 2
+    assert _robot_status(bot_id) == robot.StatusEnum.FAILED
+    agent.close()
+    sess.close()
+
+def test_agent_rejects_foreign_or_unknown_modules(robot_server):
+    bot_id, ids = robot_server.bot_id, robot_server.ids
+    sess = module.Session()
+    bot = sess.query(module.Robot).filter_by(id=bot_id).first()
+    with pytest.raises(ValueError):
+        module_agent.ModuleAgent(sess, bot, ids + ["nope"])
+
+    agent = module_agent.ModuleAgent(sess, bot, ids[:2])
+    with pytest.raises(KeyError):
+        agent.post(ids[3], "RUNNING")
+    with pytest.raises(ValueError):
+        agent.post(ids[0], "EXPLODED")
+    sess.close()
+
+def test_local_unix_socket_api(robot_server, tmp_path):
+    bot_id, ids, conns = robot_server.bot_id, robot_server.ids, robot_server.conns
+    sess = module.Session()
+    bot = sess.query(module.Robot).filter_by(id=bot_id).first()
+    agent = module_agent.ModuleAgent(sess, bot, ids)
+
+    path = str(tmp_path / "agent.sock")
+    server = module_agent.AgentServer(path, agent)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = module_agent.AgentClient(path)
+        client.post(ids[0], "RUNNING")
+        with pytest.raises(RuntimeError):
+            client.post("not-hosted", "RUNNING")
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert _wait_for(lambda: _robot_status(bot_id) == robot.StatusEnum.RUNNING)
+    agent.close()
+    sess.close()
+
+def test_authenticated_agent_session(robot_server, monkeypatch):
+    bot_id, ids, conns = robot_server.bot_id, robot_server.ids, robot_server.conns
+    monkeypatch.setattr(robot, "REQUIRE_AUTH", True)
+    sess = module.Session()
+    bot = sess.query(module.Robot).filter_by(id=bot_id).first()
+
+    agent = module_agent.ModuleAgent(sess, bot, ids, password="pw")
+    agent.post(ids[0], "RUNNING")
+    agent.post(ids[1], "FAILED")
+    assert agent.sid is not None and agent.seq == 2
+    assert agent.sid in robot.SESSIONS.sessions
+    assert _wait_for(lambda: _robot_status(bot_id) == robot.StatusEnum.FAILED)
+    agent.close()
+    # the session dies with its connection
+    assert _wait_for(lambda: not robot.SESSIONS.sessions)
+    sess.close()
+
+def test_wrong_password_and_unauthenticated_are_refused(robot_server, monkeypatch):
+    bot_id, ids = robot_server.bot_id, robot_server.ids
+    monkeypatch.setattr(robot, "REQUIRE_AUTH", True)
+    sess = module.Session()
+    bot = sess.query(module.Robot).filter_by(id=bot_id).first()
+
+    with pytest.raises(ConnectionError):
+        module_agent.ModuleAgent(sess, bot, ids, password="wrong").connect()
+    with pytest.raises(ConnectionError):
+        module_agent.ModuleAgent(sess, bot, ids).connect()
+
+    # legacy one-shot messages are dropped too
+    with socket.create_connection(("127.0.0.1", bot.port)) as s:
+        s.sendall(json.dumps({"module_id": ids[0], "status": "FAILED"}).encode())
+        s.shutdown(socket.SHUT_WR)
+        s.recv(1)
+    assert _robot_status(bot_id) == robot.StatusEnum.IDLE
+    sess.close()
+
+def test_tampered_frame_closes_session(robot_server):
+    bot_id, ids = robot_server.bot_id, robot_server.ids
+    sess = module.Session()
+    bot = sess.query(module.Robot).filter_by(id=bot_id).first()
+    agent = module_agent.ModuleAgent(sess, bot, ids, password="pw")
+    agent.connect()
+
+    frame = auth.sign(agent.key, agent.sid, 1, {"module_id": ids[0], "status": "RUNNING"})
+    frame["msg"]["status"] = "FAILED"
+    agent.sock.sendall(json.dumps(frame).encode() + b"\n")
+    reply = json.loads(agent.reader.readline())
+    assert reply == {"error": "invalid or expired session"}
+    assert agent.reader.readline() == b""
+    assert _robot_status(bot_id) == robot.StatusEnum.IDLE
+    agent.close()
+    sess.close()
+
+def test_module_cli_authenticates_with_auth_flag(robot_server, monkeypatch, capsys):
+    bot_id, ids = robot_server.bot_id, robot_server.ids
+    monkeypatch.setattr(robot, "REQUIRE_AUTH", True)
+    monkeypatch.setenv("ROBOT_PASSWORD", "pw")
+    monkeypatch.setattr(module.sys, "argv", ["prog", ids[0], "--auth"])
+    inputs = iter(["FAILED power_level=0.25", KeyboardInterrupt()])
+    def fake_input(prompt=""):
+        val = next(inputs)
+        if isinstance(val, Exception):
+            raise val
+        return val
+    monkeypatch.setattr("builtins.input", fake_input)
+
+    module.main()
+
+    assert "Sent →" in capsys.readouterr().out
+    assert _robot_status(bot_id) == robot.StatusEnum.FAILED
+    assert robot.FLEET.robot_power[robot.FLEET.robot_slots[bot_id]] == pytest.approx(0.25)
+
+def test_module_cli_reports_wrong_password(robot_server, monkeypatch, capsys):
+    bot_id, ids = robot_server.bot_id, robot_server.ids
+    monkeypatch.setattr(robot, "REQUIRE_AUTH", True)
+    monkeypatch.setenv("ROBOT_PASSWORD", "wrong")
+    monkeypatch.setattr(module.sys, "argv", ["prog", ids[0], "--auth"])
+    inputs = iter(["FAILED", KeyboardInterrupt()])
+    def fake_input(prompt=""):
+        val = next(inputs)
+        if isinstance(val, Exception):
+            raise val
+        return val
+    monkeypatch.setattr("builtins.input", fake_input)
+
+    module.main()
+
+    out = capsys.readouterr().out
+    assert "ERROR: robot did not accept the update" in out
+    assert "Sent →" not in out
+    assert _robot_status(bot_id) == robot.StatusEnum.IDLE
+
+def _reset(sock):
+    # close with an RST instead of a FIN, like a crashed peer
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    sock.close()
+
+def test_stream_survives_peer_reset(robot_server, monkeypatch):
+    errors = []
+    monkeypatch.setattr(threading, "excepthook", errors.append)
+    for _ in range(5):
+        sock = socket.create_connection(("127.0.0.1", robot_server.port))
+        reader = sock.makefile("rb")
+        sock.sendall(json.dumps({"hello": "agent", "modules": robot_server.ids}).encode() + b"\n")
+        assert json.loads(reader.readline())["ready"]
+        sock.sendall(json.dumps({"module_id": robot_server.ids[0], "status": "RUNNING"}).encode() + b"\n")
+        reader.close()
+        _reset(sock)
+    for t in robot_server.handlers:
+        t.join(timeout=5)
+    assert errors == []
+
+def test_handshake_survives_client_abort(robot_server, monkeypatch):
+    errors = []
+    monkeypatch.setattr(threading, "excepthook", errors.append)
+    hello = {"hello": "agent", "modules": robot_server.ids, "auth": {"client_nonce": "00"}}
+    for wait_for_challenge in (True, False) * 3:
+        sock = socket.create_connection(("127.0.0.1", robot_server.port))
+        sock.sendall(json.dumps(hello).encode() + b"\n")
+        if wait_for_challenge:
+            assert "challenge" in json.loads(sock.makefile("rb").readline())
+        _reset(sock)
+    for t in robot_server.handlers:
+        t.join(timeout=5)
+    assert errors == []
+    assert not robot.SESSIONS.sessions
@@ -0,0 +1,163 @@
+import socket
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from .. import aggregator, replication
+from ..fleet_state import FleetState, STATUS_CODES
+
+@pytest.fixture
+def agg(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fleet.db'}",
+                           connect_args={"check_same_thread": False})
+    monkeypatch.setattr(aggregator, "engine", engine)
+    monkeypatch.setattr(aggregator, "Session", sessionmaker(bind=engine))
+    aggregator.Base.metadata.create_all(engine)
+
+    server = aggregator.AggregatorServer(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+def _fleet(robot_id, n):
+    fleet = FleetState()
+    rslot = fleet.add_robot(robot_id, STATUS_CODES["IDLE"], 1.0)
+    for i in range(n):
+        fleet.add_module(f"{robot_id}-m{i}", rslot, STATUS_CODES["IDLE"], 1.0)
+    return fleet
+
+def _agg_state():
+    sess = aggregator.Session()
+    try:
+        mods   = {m.id: m.status for m in sess.query(aggregator.FleetModule)}
+        robots = {r.id: (r.status, r.power_level) for r in sess.query(aggregator.FleetRobot)}
+        return mods, robots
+    finally:
+        sess.close()
+
+def test_initial_sync_then_only_deltas(agg):
+    fleet = _fleet("r1", 50)
+    rep = replication.Replicator(fleet, "127.0.0.1", agg, "r1", batch_size=20)
+    rep.sync_once()
+
+    mods, robots = _agg_state()
+    assert len(mods) == 50 and robots == {"r1": ("IDLE", 0.0)}
+    assert rep.batches == 3 and not fleet.changes
+
+    assert rep.rows_sent == 51
+    with fleet.lock:
+        fleet.set_status(fleet.slots["r1-m7"], STATUS_CODES["FAILED"], 2.0)
+        fleet.set_power(0, 0.5)
+    rep.sync_once()
+
+    mods, robots = _agg_state()
+    assert mods["r1-m7"] == "FAILED"
+    assert robots["r1"] == ("FAILED", 0.5)
+    assert rep.batches == 4
+    # only the changed module and robot rows are shipped
+    assert rep.rows_sent == 53
+    rep.close()
+
+def test_resumes_from_last_ack_after_disconnect(agg):
+    fleet = _fleet("r1", 10)
+    rep = replication.Replicator(fleet, "127.0.0.1", agg, "r1")
+    rep.sync_once()
+    rep.close()
+
+    with fleet.lock:
+        fleet.set_status(fleet.slots["r1-m3"], STATUS_CODES["RUNNING"], 3.0)
+    seq_before = fleet.seq
+
+    # reconnect with the same epoch: only the pending change is shipped
+    rep.sync_once()
+    assert rep.sent == seq_before
+    assert rep.batches == 2
+    assert _agg_state()[0]["r1-m3"] == "RUNNING"
+    rep.close()
+
+def test_new_epoch_resends_everything(agg):
+    fleet = _fleet("r1", 5)
+    rep = replication.Replicator(fleet, "127.0.0.1", agg, "r1")
+    rep.sync_once()
+    rep.close()
+
+    # robot restarted: fresh fleet state, sequence numbers start over
+    fleet2 = _fleet("r1", 5)
+    with fleet2.lock:
+        fleet2.prune(fleet2.seq)   # pretend nothing is pending
+    rep2 = replication.Replicator(fleet2, "127.0.0.1", agg, "r1")
+    rep2.sync_once()
+    assert rep2.batches == 1
+    assert len(_agg_state()[0]) == 5
+    rep2.close()
+
+def test_many_sources_share_one_aggregator(agg):
+    reps = [replication.Replicator(_fleet(f"r{i}", 20), "127.0.0.1", agg, f"r{i}") for i in range(10)]
+    threads = [threading.Thread(target=r.sync_once) for r in reps]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    mods, robots = _agg_state()
+    assert len(mods) == 200 and len(robots) == 10
+    for r in reps:
+        r.close()
+
+def test_frames_are_compressed():
+    a, b = socket.socketpair()
+    rows = [[f"module-{i}", "robot", "IDLE", 1.0] for i in range(200)]
+    size = replication.send_frame(a, {"seq": 1, "modules": rows, "robots": []})
+    assert replication.recv_frame(b)["modules"] == rows
+    assert size < len(repr(rows)) / 4
+    a.close()
+    b.close()
+
+def test_aggregator_drops_corrupt_or_malformed_batches(agg):
+    for bad in (replication.FRAME.pack(4) + b"junk", None):
+        sock = socket.create_connection(("127.0.0.1", agg))
+        replication.send_frame(sock, {"source": "r1", "epoch": "e1"})
+        assert replication.recv_frame(sock) == {"epoch": None, "acked": 0}
+        if bad is not None:
+            sock.sendall(bad)
+        else:
+            # rows are upserted before the missing "seq" is noticed
+            replication.send_frame(sock, {"modules": [["m1", "r1", "IDLE", 1.0]]})
+        assert sock.recv(1) == b""
+        sock.close()
+    assert _agg_state() == ({}, {})
+
+    # the aggregator keeps serving
+    rep = replication.Replicator(_fleet("r1", 3), "127.0.0.1", agg, "r1")
+    rep.sync_once()
+    assert len(_agg_state()[0]) == 3
+    rep.close()
+
+def test_replicator_survives_corrupt_replies():
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    srv.listen()
+    accepted = threading.Semaphore(0)
+
+    def serve():
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                return
+            with conn:
+                replication.recv_frame(conn)
+                conn.sendall(replication.FRAME.pack(4) + b"junk")
+            accepted.release()
+
+    threading.Thread(target=serve, daemon=True).start()
+    rep = replication.Replicator(_fleet("r1", 1), "127.0.0.1", srv.getsockname()[1], "r1", interval=0.01)
+    t = rep.start()
+    # the replicator thread keeps reconnecting instead of dying
+    assert accepted.acquire(timeout=5) and accepted.acquire(timeout=5)
+    assert t.is_alive()
+    rep.stop()
+    t.join(timeout=5)
+    srv.close()
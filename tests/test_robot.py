@@ -1,10 +1,10 @@
 import json
+import threading
 from datetime import datetime, timezone
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 from .. import robot  # still your module
+from .conftest import make_robot
 
 class DummyConn:
     def __init__(self, data: bytes):
@@ -12,59 +12,12 @@ class DummyConn:
     def recv(self, bufsize: int) -> bytes:
         return self._data
 
-@pytest.fixture(autouse=True)
-def in_memory_db(monkeypatch):
-    # patch engine & Session to use an in‑memory SQLite database
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False}
-    )
-    Session = sessionmaker(bind=engine)
-    monkeypatch.setattr(robot, "engine", engine)
-    monkeypatch.setattr(robot, "Session", Session)
-    # create all tables
-    robot.Base.metadata.create_all(engine)
-    yield
-    # teardown happens automatically
-
-def _make_robot_and_modules(session, module_statuses):
-    """
-    Helper to insert one Robot plus one Module per status in module_statuses.
-    module_statuses: list of strings, e.g. ["IDLE","RUNNING","FAILED"]
-    """
-    # create a robot instance
-    bot = robot.Robot(
-        name="TestBot",
-        owner="alice",
-        owner_email="alice@example.com",
-        network_ssid="net",
-        network_password="pw",
-        ip_address="127.0.0.1",
-        port=9000,
-        password="pw"
-    )
-    session.add(bot)
-    session.commit()
-
-    mods = []
-    for i, st in enumerate(module_statuses, start=1):
-        m = robot.Module(
-            name=f"mod{i}",
-            type=robot.ModuleType.VISION,
-            ip_address=f"10.0.0.{i}",
-            port=1000 + i,
-            status=robot.StatusEnum[st],
-            robot_id=bot.id
-        )
-        session.add(m)
-        mods.append(m)
-    session.commit()
-    return bot, mods
-
-def test_handle_client_with_failed_incoming_prints_alert_and_keeps_idle(monkeypatch, capsys):
+pytestmark = pytest.mark.usefixtures("robot_db")
+
+def test_handle_client_with_failed_incoming_prints_alert_and_marks_failed(monkeypatch, capsys):
     sess = robot.Session()
     # all modules currently IDLE
-    bot, mods = _make_robot_and_modules(sess, ["IDLE", "IDLE"])
+    bot, mods = make_robot(sess, ["IDLE", "IDLE"])
 
     payload = {"module_id": mods[0].id, "status": "FAILED"}
     conn = DummyConn(json.dumps(payload).encode())
@@ -72,13 +25,16 @@ def test_handle_client_with_failed_incoming_prints_alert_and_keeps_idle(monkeypa
     before = datetime.now(timezone.utc)
     robot.handle_client(conn, bot.id)
     after = datetime.now(timezone.utc)
+    # alerts are delivered by the dispatcher thread
+    robot.ALERTS.flush()
 
     # reload robot
     sess2 = robot.Session()
     updated = sess2.query(robot.Robot).get(bot.id)
 
-    # since DB modules are both IDLE, robot.status stays IDLE
-    assert updated.status == robot.StatusEnum.IDLE
+    # the incoming FAILED is applied to the fleet state → robot FAILED
+    assert updated.status == robot.StatusEnum.FAILED
+    assert sess2.query(robot.Module).get(mods[0].id).status == robot.StatusEnum.FAILED
 
     # last_online should be updated to a timestamp between before/after
     assert before <= updated.last_online <= after
@@ -91,12 +47,13 @@ def test_handle_client_with_failed_incoming_prints_alert_and_keeps_idle(monkeypa
 def test_handle_client_running_updates_to_running_without_alert(capsys):
     sess = robot.Session()
     # one module IDLE, one RUNNING
-    bot, mods = _make_robot_and_modules(sess, ["IDLE", "RUNNING"])
+    bot, mods = make_robot(sess, ["IDLE", "RUNNING"])
 
     payload = {"module_id": mods[0].id, "status": "IDLE"}  # incoming IDLE
     conn = DummyConn(json.dumps(payload).encode())
 
     robot.handle_client(conn, bot.id)
+    robot.ALERTS.flush()
 
     sess2 = robot.Session()
     updated = sess2.query(robot.Robot).get(bot.id)
@@ -111,12 +68,13 @@ def test_handle_client_running_updates_to_running_without_alert(capsys):
 def test_handle_client_failed_in_db_updates_to_failed_without_alert(capsys):
     sess = robot.Session()
     # one module FAILED in DB, one IDLE
-    bot, mods = _make_robot_and_modules(sess, ["FAILED", "IDLE"])
+    bot, mods = make_robot(sess, ["FAILED", "IDLE"])
 
     payload = {"module_id": mods[1].id, "status": "RUNNING"}  # incoming RUNNING
     conn = DummyConn(json.dumps(payload).encode())
 
     robot.handle_client(conn, bot.id)
+    robot.ALERTS.flush()
 
     sess2 = robot.Session()
     updated = sess2.query(robot.Robot).get(bot.id)
@@ -126,4 +84,120 @@ def test_handle_client_failed_in_db_updates_to_failed_without_alert(capsys):
 
     out = capsys.readouterr().out
     # still no alert, since incoming_status != FAILED
-    assert out == ""
\ No newline at end of file
+    assert out == ""
+
+def test_handle_client_telemetry_updates_power_and_persists_summaries(monkeypatch):
+    monkeypatch.setattr(robot, "TELEMETRY", robot.telemetry.TelemetryStore(capacity=4, bucket=2))
+    sess = robot.Session()
+    bot, mods = make_robot(sess, ["RUNNING"])
+
+    payload = {
+        "module_id": mods[0].id,
+        "status": "RUNNING",
+        "telemetry": {"power_level": 0.42, "accel_x": [1, 2, 3, 4]},
+    }
+    robot.handle_client(DummyConn(json.dumps(payload).encode()), bot.id)
+
+    sess2 = robot.Session()
+    updated = sess2.query(robot.Robot).get(bot.id)
+    assert abs(updated.power_level - 0.42) < 1e-9
+
+    # accel_x filled its buffer → two downsampled rows; power_level still buffered
+    rows = sess2.query(robot.Telemetry).order_by(robot.Telemetry.id).all()
+    assert [(r.channel, r.samples, r.min, r.max, r.mean) for r in rows] == [
+        ("accel_x", 2, 1.0, 2.0, 1.5),
+        ("accel_x", 2, 3.0, 4.0, 3.5),
+    ]
+    assert all(r.module_id == mods[0].id for r in rows)
+
+def test_bad_telemetry_channels_do_not_drop_the_status_update():
+    sess = robot.Session()
+    bot, mods = make_robot(sess, ["IDLE"])
+
+    payload = {
+        "module_id": mods[0].id,
+        "status": "RUNNING",
+        "telemetry": {"power_level": "high", "accel_x": [1, {"a": 1}], "gyro_z": [1, 2],
+                      "temp": "21.5", "volts": float("nan")},
+    }
+    assert robot.process_message(payload, bot.id)
+    assert robot.process_message({"module_id": mods[0].id, "status": "FAILED", "telemetry": 5}, bot.id)
+
+    sess2 = robot.Session()
+    updated = sess2.get(robot.Robot, bot.id)
+    assert updated.status == robot.StatusEnum.FAILED
+    assert not updated.power_level
+    assert {c for _, c, _ in robot.TELEMETRY.flush()} == {"gyro_z", "temp"}
+
+def test_flush_telemetry_persists_partial_buffers():
+    sess = robot.Session()
+    bot, mods = make_robot(sess, ["RUNNING"])
+    payload = {"module_id": mods[0].id, "status": "RUNNING", "telemetry": {"power_level": 0.5}}
+    robot.handle_client(DummyConn(json.dumps(payload).encode()), bot.id)
+
+    sess2 = robot.Session()
+    assert sess2.query(robot.Telemetry).count() == 0
+    assert robot.flush_telemetry() == 1
+    row = sess2.query(robot.Telemetry).one()
+    assert (row.module_id, row.channel, row.samples, row.mean) == (mods[0].id, "power_level", 1, 0.5)
+    assert robot.flush_telemetry() == 0
+
+def test_handle_client_ignores_unknown_module(capsys):
+    sess = robot.Session()
+    bot, mods = make_robot(sess, ["IDLE"])
+
+    payload = {"module_id": "no-such-module", "status": "FAILED"}
+    robot.handle_client(DummyConn(json.dumps(payload).encode()), bot.id)
+
+    sess2 = robot.Session()
+    assert sess2.query(robot.Robot).get(bot.id).status == robot.StatusEnum.IDLE
+    assert capsys.readouterr().out == ""
+
+def test_fleet_state_tracks_aggregate_without_rescanning():
+    sess = robot.Session()
+    bot, mods = make_robot(sess, ["IDLE", "IDLE"])
+
+    for mod, st in [(mods[0], "RUNNING"), (mods[1], "FAILED"), (mods[1], "IDLE")]:
+        robot.process_message({"module_id": mod.id, "status": st}, bot.id)
+
+    rslot = robot.FLEET.robot_slots[bot.id]
+    assert list(robot.FLEET.counts[rslot]) == [1, 1, 0]
+    assert robot.STATUS_NAMES[robot.FLEET.robot_status[rslot]] == "RUNNING"
+
+    sess2 = robot.Session()
+    assert sess2.query(robot.Robot).get(bot.id).status == robot.StatusEnum.RUNNING
+
+def test_handle_client_flapping_module_alerts_once(capsys):
+    sess = robot.Session()
+    bot, mods = make_robot(sess, ["IDLE"])
+
+    for st in ["FAILED", "RUNNING", "FAILED", "IDLE", "FAILED"]:
+        payload = {"module_id": mods[0].id, "status": st}
+        robot.handle_client(DummyConn(json.dumps(payload).encode()), bot.id)
+    robot.ALERTS.flush()
+
+    out = capsys.readouterr().out
+    assert out.count("STATUS: FAILED") == 1
+
+def test_concurrent_updates_leave_db_matching_fleet_state():
+    sess = robot.Session()
+    bot, mods = make_robot(sess, ["IDLE"] * 8)
+    ids = [m.id for m in mods]
+
+    def worker(k):
+        for step in range(10):
+            st = ("RUNNING", "FAILED", "IDLE")[(k + step) % 3]
+            robot.process_message({"module_id": ids[k], "status": st}, bot.id)
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(len(ids))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    rslot = robot.FLEET.robot_slots[bot.id]
+    sess2 = robot.Session()
+    assert sess2.get(robot.Robot, bot.id).status.name == robot.STATUS_NAMES[robot.FLEET.robot_status[rslot]]
+    for mid in ids:
+        slot = robot.FLEET.slots[mid]
+        assert sess2.get(robot.Module, mid).status.name == robot.STATUS_NAMES[robot.FLEET.status[slot]]
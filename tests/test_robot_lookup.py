@@ -0,0 +1,90 @@
+import builtins
+import getpass
+
+import pytest
+
+from .. import robot
+from .. import robot_lookup
+
+@pytest.fixture
+def sess(robot_db):
+    s = robot.Session()
+    for i in range(45):
+        s.add(robot.Robot(
+            id=f"{i:04d}-robot", name=f"bot{i}", owner="alice" if i % 2 else "bob",
+            owner_email="x@example.com", network_ssid="n", network_password="p",
+            ip_address="127.0.0.1", port=9000 + i, password="pw"
+        ))
+    s.commit()
+    yield s
+    s.close()
+
+def test_keyset_pagination_walks_every_robot_once(sess):
+    seen, after = [], None
+    while True:
+        page = robot_lookup.find_robots(sess, robot.Robot, after=after)
+        seen.extend(r.id for r in page)
+        if len(page) < robot_lookup.PAGE_SIZE:
+            break
+        after = page[-1].id
+    assert seen == sorted(f"{i:04d}-robot" for i in range(45))
+
+def test_prefix_search_matches_id_name_and_owner(sess):
+    by_id = robot_lookup.find_robots(sess, robot.Robot, prefix="001")
+    assert [r.id for r in by_id] == [f"{i:04d}-robot" for i in range(10, 20)]
+
+    by_name = robot_lookup.find_robots(sess, robot.Robot, prefix="bot4")
+    assert sorted(r.name for r in by_name) == ["bot4", "bot40", "bot41", "bot42", "bot43", "bot44"]
+
+    by_owner = robot_lookup.find_robots(sess, robot.Robot, prefix="ali", limit=100)
+    assert len(by_owner) == 22 and all(r.owner == "alice" for r in by_owner)
+
+def test_match_robots_prefers_exact_id(sess):
+    assert [r.id for r in robot_lookup.match_robots(sess, robot.Robot, "0007-robot")] == ["0007-robot"]
+    assert len(robot_lookup.match_robots(sess, robot.Robot, "00")) == 2
+    assert robot_lookup.match_robots(sess, robot.Robot, "zzz") == []
+
+def test_match_robots_ignores_name_and_owner(sess):
+    sess.add(robot.Robot(
+        id="b7-robot", name="0042-lookalike", owner="carol", owner_email="x@example.com",
+        network_ssid="n", network_password="p", ip_address="127.0.0.1", port=9999, password="pw"
+    ))
+    sess.commit()
+    # a unique id prefix is not made ambiguous by another robot's name
+    assert [r.id for r in robot_lookup.match_robots(sess, robot.Robot, "0042")] == ["0042-robot"]
+    # names and owners never select a robot
+    assert robot_lookup.match_robots(sess, robot.Robot, "bot4") == []
+    assert robot_lookup.match_robots(sess, robot.Robot, "ali") == []
+    # the picker's /search still matches them
+    assert len(robot_lookup.find_robots(sess, robot.Robot, prefix="0042")) == 2
+
+def test_indexes_exist(sess):
+    names = {ix["name"] for ix in robot.inspect(robot.engine).get_indexes("robots")}
+    assert {"ix_robots_name", "ix_robots_owner"} <= names
+
+def test_browse_pages_then_searches(sess, monkeypatch, capsys):
+    inputs = iter(["", "/bot44", "0044"])
+    monkeypatch.setattr(builtins, "input", lambda prompt="": next(inputs))
+    chosen = robot_lookup.browse_robots(sess, robot.Robot, lambda r: r.id, "Pick:", "> ")
+    assert chosen.id == "0044-robot"
+
+    out = capsys.readouterr().out
+    # first page, second page, then the search results; never all 45 at once
+    assert "0019-robot" in out and "0039-robot" in out
+    assert out.count("0044-robot") == 1
+
+def test_select_or_create_robot_with_selector(sess, monkeypatch, capsys):
+    monkeypatch.setattr(getpass, "getpass", lambda prompt="": "pw")
+    robot.CREDENTIALS["0033-robot"] = robot.auth.parse_hash(robot.auth.hash_password("pw", iterations=1))
+    chosen = robot.select_or_create_robot(sess, "0033")
+    assert chosen.id == "0033-robot"
+    # the legacy plaintext password was rehashed and the cached credential dropped
+    sess.expire_all()
+    stored = sess.get(robot.Robot, "0033-robot").password
+    assert robot.auth.parse_hash(stored) is not None
+    assert robot.auth.verify_password("pw", stored)
+    assert "0033-robot" not in robot.CREDENTIALS
+
+    with pytest.raises(SystemExit):
+        robot.select_or_create_robot(sess, "00")
+    assert "Ambiguous robot ID" in capsys.readouterr().out
@@ -0,0 +1,132 @@
+import threading
+
+import pytest
+
+from .. import robot, statusboard
+from .conftest import make_robot
+
+def test_board_roundtrip(tmp_path, capsys):
+    path = str(tmp_path / "board")
+    board = statusboard.StatusBoard(path, capacity=8)
+    board.update(0, "mod-a", 1, 100.0)
+    board.update(2, "mod-c", 2, 102.5)
+    board.update_robot("bot", 2, 102.5)
+
+    reader = statusboard.StatusBoardReader(path)
+    assert reader.capacity == 8
+    assert reader.count == 3
+    assert reader.read(0) == ("mod-a", "RUNNING", 100.0)
+    assert reader.read(1) is None
+    assert reader.find("mod-c") == ("mod-c", "FAILED", 102.5)
+    assert reader.find("missing") is None
+    assert reader.robot() == ("bot", "FAILED", 102.5)
+    assert reader.snapshot() == [("mod-a", "RUNNING", 100.0), ("mod-c", "FAILED", 102.5)]
+
+    # later writes are visible through the same mapping
+    board.update(0, "mod-a", 0, 200.0)
+    assert reader.find("mod-a") == ("mod-a", "IDLE", 200.0)
+    assert not board.update(8, "overflow", 0, 0.0)
+    assert not board.update(9, "overflow", 0, 0.0)
+    assert board.overflow == 2
+    # warned once, not per dropped update
+    assert capsys.readouterr().err.count("status board") == 1
+    reader.close()
+    board.close()
+
+def test_board_skips_ids_it_cannot_store(tmp_path, capsys):
+    path = str(tmp_path / "board")
+    board = statusboard.StatusBoard(path, capacity=4)
+    long_id = "x" * (statusboard.ID_SIZE + 1)
+    for _ in range(2):
+        assert not board.update(0, "modulé", 1, 1.0)
+        assert not board.update(1, long_id, 1, 1.0)
+    assert not board.update_robot("robøt", 1, 1.0)
+    assert board.update(2, "mod-c", 2, 3.0)
+
+    err = capsys.readouterr().err
+    assert err.count("modulé") == 1 and err.count(long_id) == 1
+    # the skipped slots were never touched, so every read still succeeds
+    reader = statusboard.StatusBoardReader(path)
+    assert reader.read(0) is None and reader.robot() is None
+    assert reader.find("mod-c") == ("mod-c", "FAILED", 3.0)
+    assert reader.snapshot() == [("mod-c", "FAILED", 3.0)]
+    reader.close()
+    board.close()
+
+def test_reader_never_returns_half_written_record(tmp_path):
+    path = str(tmp_path / "board")
+    board = statusboard.StatusBoard(path, capacity=1)
+    board.update(0, "mod-a", 0, 1.0)
+    reader = statusboard.StatusBoardReader(path)
+
+    # writer stuck mid-update: sequence is odd
+    off = statusboard._offset(0)
+    seq = statusboard.SEQ.unpack_from(board.mm, off)[0]
+    statusboard.SEQ.pack_into(board.mm, off, seq + 1)
+    with pytest.raises(RuntimeError):
+        reader._read(0, retries=10)
+
+    statusboard.SEQ.pack_into(board.mm, off, seq)
+    assert reader.read(0) == ("mod-a", "IDLE", 1.0)
+    reader.close()
+    board.close()
+
+def test_concurrent_reads_are_consistent(tmp_path):
+    path = str(tmp_path / "board")
+    board = statusboard.StatusBoard(path, capacity=1)
+    board.update(0, "mod-a", 0, 0.0)
+    reader = statusboard.StatusBoardReader(path)
+    stop = threading.Event()
+
+    def write():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            # status and timestamp always move together
+            board.update(0, "mod-a", i % 3, float(i % 3))
+
+    t = threading.Thread(target=write)
+    t.start()
+    try:
+        for _ in range(2000):
+            _, status, stamp = reader.read(0)
+            assert statusboard.STATUS_NAMES[int(stamp)] == status
+    finally:
+        stop.set()
+        t.join()
+    reader.close()
+    board.close()
+
+def test_robot_server_publishes_to_board(tmp_path, monkeypatch, robot_db):
+    sess = robot.Session()
+    bot, (mod,) = make_robot(sess, ["IDLE"])
+
+    path = str(tmp_path / "board")
+    board = statusboard.StatusBoard(path, capacity=16)
+    monkeypatch.setattr(robot, "BOARD", board)
+    robot.process_message({"module_id": mod.id, "status": "FAILED"}, bot.id)
+    robot.ALERTS.flush()
+
+    reader = statusboard.StatusBoardReader(path)
+    module_id, status, stamp = reader.find(mod.id)
+    assert (module_id, status) == (mod.id, "FAILED") and stamp > 0
+    assert reader.robot()[:2] == (bot.id, "FAILED")
+    reader.close()
+    board.close()
+
+def test_board_errors_do_not_lose_the_status_update(tmp_path, monkeypatch, robot_db, capsys):
+    sess = robot.Session()
+    bot, (mod,) = make_robot(sess, ["IDLE"])
+
+    board = statusboard.StatusBoard(str(tmp_path / "board"), capacity=16)
+    def broken(*args):
+        raise RuntimeError("board is broken")
+    monkeypatch.setattr(board, "update", broken)
+    monkeypatch.setattr(robot, "BOARD", board)
+
+    assert robot.process_message({"module_id": mod.id, "status": "FAILED"}, bot.id)
+    assert "status board update failed" in capsys.readouterr().err
+    sess2 = robot.Session()
+    assert sess2.get(robot.Module, mod.id).status == robot.StatusEnum.FAILED
+    assert sess2.get(robot.Robot, bot.id).status == robot.StatusEnum.FAILED
+    board.close()
@@ -0,0 +1,62 @@
+from .. import telemetry
+
+def test_ring_buffer_overwrites_oldest():
+    buf = telemetry.RingBuffer(capacity=4)
+    buf.push([1.0, 2.0, 3.0, 4.0, 5.0, 6.0], stamp=10.0)
+    assert buf.count == 4
+    values, stamps = buf.drain()
+    assert list(values) == [3.0, 4.0, 5.0, 6.0]
+    assert list(stamps) == [10.0] * 4
+    assert buf.count == 0
+
+def test_downsample_buckets():
+    values = [1.0, 5.0, 3.0, 2.0, 8.0]
+    stamps = [0.0, 1.0, 2.0, 3.0, 4.0]
+    out = telemetry.downsample(values, stamps, bucket=2)
+    assert out == [
+        (0.0, 1.0, 2, 1.0, 5.0, 3.0),
+        (2.0, 3.0, 2, 2.0, 3.0, 2.5),
+        (4.0, 4.0, 1, 8.0, 8.0, 8.0),
+    ]
+
+def test_store_returns_summaries_only_when_full():
+    store = telemetry.TelemetryStore(capacity=4, bucket=2)
+    assert store.push("m1", "accel_x", [1.0, 2.0, 3.0], stamp=1.0) == []
+    out = store.push("m1", "accel_x", 4.0, stamp=2.0)
+    assert out == [(1.0, 1.0, 2, 1.0, 2.0, 1.5), (1.0, 2.0, 2, 3.0, 4.0, 3.5)]
+    # buffer was drained, nothing left to flush
+    assert list(store.flush()) == []
+
+def test_store_push_crossing_capacity_keeps_every_sample():
+    store = telemetry.TelemetryStore(capacity=4, bucket=4)
+    assert store.push("m1", "accel_x", [1.0, 2.0, 3.0], stamp=1.0) == []
+    # crosses capacity: 1..4 complete a window, 5 and 6 start the next one
+    assert store.push("m1", "accel_x", [4.0, 5.0, 6.0], stamp=2.0) == [(1.0, 2.0, 4, 1.0, 4.0, 2.5)]
+    # one push of several windows' worth summarises each full window
+    out = store.push("m2", "gyro_z", [float(v) for v in range(10)], stamp=3.0)
+    assert out == [(3.0, 3.0, 4, 0.0, 3.0, 1.5), (3.0, 3.0, 4, 4.0, 7.0, 5.5)]
+    flushed = {(m, c): s for m, c, s in store.flush()}
+    assert flushed == {
+        ("m1", "accel_x"): [(2.0, 2.0, 2, 5.0, 6.0, 5.5)],
+        ("m2", "gyro_z"): [(3.0, 3.0, 2, 8.0, 9.0, 8.5)],
+    }
+
+def test_store_flush_partial_buffers():
+    store = telemetry.TelemetryStore(capacity=8, bucket=8)
+    store.push("m1", "power_level", 0.5, stamp=1.0)
+    store.push("m2", "gyro_z", [1.0, 3.0], stamp=2.0)
+    flushed = {(m, c): s for m, c, s in store.flush()}
+    assert flushed[("m1", "power_level")] == [(1.0, 1.0, 1, 0.5, 0.5, 0.5)]
+    assert flushed[("m2", "gyro_z")] == [(2.0, 2.0, 2, 1.0, 3.0, 2.0)]
+
+def test_store_caps_channels_per_module():
+    store = telemetry.TelemetryStore(capacity=4, bucket=4, max_channels=2)
+    store.push("m1", "a", 1.0, stamp=1.0)
+    store.push("m1", "b", 2.0, stamp=1.0)
+    assert store.push("m1", "c", [1.0] * 8, stamp=1.0) == []
+    # existing channels and other modules are unaffected
+    store.push("m1", "a", 3.0, stamp=2.0)
+    store.push("m2", "c", 4.0, stamp=2.0)
+    assert store.rejected == 1
+    assert len(store.buffers) == 3
+    assert sorted((m, c) for m, c, _ in store.flush()) == [("m1", "a"), ("m1", "b"), ("m2", "c")]